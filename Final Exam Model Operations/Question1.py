@@ -1,55 +1,83 @@
+import time
 import pandas as pd
 from gurobipy import Model, GRB
+from ecogreen import build_model, benders_instance
+from whatif import what_if
+from poolexport import export_pool, within_gap
 
 # Load data
 supply_data = pd.read_csv('/Users/mahinbindra/Downloads/ecogreen_energy_supply.csv')
 demand_data = pd.read_csv('/Users/mahinbindra/Downloads/ecogreen_energy_demand.csv')
 
-# Initialize the model
-model = Model("EcoGreen Energy Expansion")
+# Build the model from the data as matrices (True) or term by term (False)?
+VECTORIZED = True
+
+# Cross-check the optimal cost with Benders decomposition (for large instances)?
+# This needs Model_Operations_Secondhalf on PYTHONPATH
+DECOMPOSE = False
 
 # Number of sites and provinces
 num_sites = supply_data.shape[0]
 num_provinces = demand_data.shape[0]
 
-# Decision Variables
-x = model.addVars(num_sites, vtype=GRB.BINARY, name="Open")
-y = model.addVars(num_sites, num_provinces, vtype=GRB.CONTINUOUS, name="Energy_Transferred")
-
-# Objective Function: Minimize total costs
-model.setObjective(
-    sum(supply_data.loc[i, 'Fixed'] * x[i] for i in range(num_sites)) +
-    sum(supply_data.loc[i, f'Province {j+1}'] * y[i, j] for i in range(num_sites) for j in range(num_provinces)),
-    GRB.MINIMIZE
-)
-
-# Constraints
-# Capacity constraints
-model.addConstrs((sum(y[i, j] for j in range(num_provinces)) <= supply_data.loc[i, 'Capacity'] * x[i]
-                  for i in range(num_sites)), "Capacity")
-
-# Demand constraints
-model.addConstrs((sum(y[i, j] for i in range(num_sites)) >= demand_data.loc[j, 'Demand']
-                  for j in range(num_provinces)), "Demand")
-
-# Mutual Exclusivity and Dependency
-model.addConstr(x[9] <= 1 - x[14], "Mutual_Exclusivity_10_15")
-model.addConstr(x[19] <= 1 - x[14], "Mutual_Exclusivity_20_15")
-model.addConstr(x[14] <= 1 - x[19], "Mutual_Exclusivity_15_20")
-model.addConstr(2 * x[2] <= x[3] + x[4], "Dependency_3_4_5")
-model.addConstr(x[4] <= x[7] + x[8], "Dependency_5_on_8_9")
-
-# Regional Plant Limits
-model.addConstr(sum(x[i] for i in range(10)) <= 2 * sum(x[i] for i in range(10, 20)), "Regional_Limits")
-
-# Energy Output Mix
-total_energy = sum(y[i, j] for i in range(5) for j in range(num_provinces))
-total_all_energy = sum(y[i, j] for i in range(num_sites) for j in range(num_provinces))
-model.addConstr(total_energy >= 0.3 * total_all_energy, "Minimum_Output")
-
-# Provincial Energy Caps
-model.addConstrs((y[i, j] <= 0.5 * demand_data.loc[j, 'Demand'] for i in range(num_sites) for j in range(num_provinces)),
-                 "Max_Energy_Per_Province")
+if VECTORIZED:
+
+    # Matrix variables and sparse constraint blocks
+    model, x, y, constrs = build_model(supply_data, demand_data)
+    build_time = model._build_time
+
+else:
+
+    build_start = time.perf_counter()
+
+    # Initialize the model
+    model = Model("EcoGreen Energy Expansion")
+
+    # Decision Variables
+    x = model.addVars(num_sites, vtype=GRB.BINARY, name="Open")
+    y = model.addVars(num_sites, num_provinces, vtype=GRB.CONTINUOUS, name="Energy_Transferred")
+
+    # Objective Function: Minimize total costs
+    model.setObjective(
+        sum(supply_data.loc[i, 'Fixed'] * x[i] for i in range(num_sites)) +
+        sum(supply_data.loc[i, f'Province {j+1}'] * y[i, j] for i in range(num_sites) for j in range(num_provinces)),
+        GRB.MINIMIZE
+    )
+
+    # Constraints, kept by family name for the what-if scenarios
+    constrs = {}
+
+    # Capacity constraints
+    constrs["Capacity"] = model.addConstrs((sum(y[i, j] for j in range(num_provinces)) <= supply_data.loc[i, 'Capacity'] * x[i]
+                      for i in range(num_sites)), "Capacity")
+
+    # Demand constraints
+    constrs["Demand"] = model.addConstrs((sum(y[i, j] for i in range(num_sites)) >= demand_data.loc[j, 'Demand']
+                      for j in range(num_provinces)), "Demand")
+
+    # Mutual Exclusivity and Dependency
+    constrs["Mutual_Exclusivity_10_15"] = model.addConstr(x[9] <= 1 - x[14], "Mutual_Exclusivity_10_15")
+    constrs["Mutual_Exclusivity_20_15"] = model.addConstr(x[19] <= 1 - x[14], "Mutual_Exclusivity_20_15")
+    constrs["Mutual_Exclusivity_15_20"] = model.addConstr(x[14] <= 1 - x[19], "Mutual_Exclusivity_15_20")
+    constrs["Dependency_3_4_5"] = model.addConstr(2 * x[2] <= x[3] + x[4], "Dependency_3_4_5")
+    constrs["Dependency_5_on_8_9"] = model.addConstr(x[4] <= x[7] + x[8], "Dependency_5_on_8_9")
+
+    # Regional Plant Limits
+    constrs["Regional_Limits"] = model.addConstr(sum(x[i] for i in range(10)) <= 2 * sum(x[i] for i in range(10, 20)), "Regional_Limits")
+
+    # Energy Output Mix
+    total_energy = sum(y[i, j] for i in range(5) for j in range(num_provinces))
+    total_all_energy = sum(y[i, j] for i in range(num_sites) for j in range(num_provinces))
+    constrs["Minimum_Output"] = model.addConstr(total_energy >= 0.3 * total_all_energy, "Minimum_Output")
+
+    # Provincial Energy Caps
+    constrs["Max_Energy_Per_Province"] = model.addConstrs((y[i, j] <= 0.5 * demand_data.loc[j, 'Demand'] for i in range(num_sites) for j in range(num_provinces)),
+                     "Max_Energy_Per_Province")
+
+    model.update()
+    build_time = time.perf_counter() - build_start
+
+print(f"Model build time: {build_time:.3f} seconds")
 
 # Optimize the model
 model.optimize()
@@ -63,6 +91,14 @@ else:
     print("No optimal solution found.")
 
 
+if DECOMPOSE:
+    # benders.py lives in Model_Operations_Secondhalf, which must be on PYTHONPATH
+    from benders import solve
+    fixed, blocks, rules = benders_instance(supply_data, demand_data)
+    objective, opened, flows = solve(fixed, blocks, rules)
+    print(f"Optimal cost with Benders decomposition: {objective}")
+
+
 print("######################## PART A ######################")
 
 # Calculate the number of distinct provinces each plant can supply
@@ -106,24 +142,20 @@ model.setParam('PoolSearchMode', 2)  # Find n best solutions
 model.setParam('PoolGap', 0.01)      # Within 1% of the optimal
 model.optimize()
 
-number_of_solutions = model.SolCount
+# The pool can also keep worse solutions found on the way
+number_of_solutions = within_gap(model)
 print(f"Number of feasible solutions within 1% of the optimal: {number_of_solutions}")
 
+# Stream the distinct plant-opening plans in the pool to a Parquet file
+number_of_plans = export_pool(model, x, 'ecogreen_pool.parquet')
+print(f"Number of distinct plant-opening plans within 1% of the optimal: {number_of_plans}")
 
-print("######################## PART K ######################")
-
-# Remove the constraint related to the 50% energy supply cap
-for i in range(num_sites):
-    for j in range(num_provinces):
-        constraint_name = f"Max_Energy_Per_Province_{i}_{j}"
-        if model.getConstrByName(constraint_name):  # Check if the constraint exists
-            model.remove(model.getConstrByName(constraint_name))
 
-# Update the model to apply the changes
-model.update()
+print("######################## PART K ######################")
 
-# Optimize the model after removing the constraint
-model.optimize()
+# Switch off the 50% energy supply cap as one family and re-solve from the
+# previous solution instead of looking up and removing each constraint by name
+what_if(model, constrs, off=["Max_Energy_Per_Province"])
 
 # Display results and count the number of power plants established
 if model.status == GRB.OPTIMAL:
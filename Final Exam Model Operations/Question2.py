@@ -1,6 +1,10 @@
+from functools import partial
+
 import gurobipy as gp
 from gurobipy import GRB
 
+from coffee import coffee_newsvendor, coffee_problem, coffee_batch
+
 # Data from the snippet
 probabilities = [0.09, 0.12, 0.10, 0.05, 0.16, 0.14, 0.03, 0.08, 0.05, 0.05, 0.04, 0.03, 0.02, 0.01, 0.02, 0.01]
 demands = [90, 95, 100, 105, 110, 115, 120, 125, 130, 135, 140, 145, 150, 155, 160, 165]
@@ -8,24 +12,36 @@ supplier_costs = [120, 105, 110]  # Costs for Phil & Sebastian, Rosso, and Monog
 advance_order_cost = 95
 min_order_quantities = [0, 70, 40]  # Minimum order quantities for Phil & Sebastian, Rosso, and Monogram
 
+# How many demand scenarios to keep after scenario reduction (all of them: no
+# reduction)? Reduction needs Model_Operations_Secondhalf on PYTHONPATH.
+KEEP = len(demands)
+
+if KEEP < len(demands):
+    from scenarioreduction import fast_forward
+    kept, weights, error = fast_forward(demands, probabilities, KEEP)
+    order = sorted(range(len(kept)), key=lambda k: demands[kept[k]])
+    demands = [demands[kept[k]] for k in order]
+    probabilities = [float(weights[k]) for k in order]
+    print("Scenario reduction error (Kantorovich distance): ", error)
+
 # Model setup
 m = gp.Model("Coffee_Supply")
 
 # Decision variables
 x = m.addVar(name="x", vtype=GRB.CONTINUOUS)  # Advanced order
-y = m.addVars(3, 16, vtype=GRB.CONTINUOUS, name="y")  # Emergency orders
+y = m.addVars(3, len(demands), vtype=GRB.CONTINUOUS, name="y")  # Emergency orders
 
 # Objective: Minimize the expected cost
-m.setObjective(advance_order_cost * x + gp.quicksum(probabilities[n] * gp.quicksum(supplier_costs[i] * y[i, n] for i in range(3)) for n in range(16)), GRB.MINIMIZE)
+m.setObjective(advance_order_cost * x + gp.quicksum(probabilities[n] * gp.quicksum(supplier_costs[i] * y[i, n] for i in range(3)) for n in range(len(demands))), GRB.MINIMIZE)
 
 # Constraints
 # Demand satisfaction in each scenario
-for n in range(16):
+for n in range(len(demands)):
     m.addConstr(x + gp.quicksum(y[i, n] for i in range(3)) >= demands[n], name=f"demand_satisfaction_{n}")
 
 # Minimum order constraints for Rosso (index 1) and Monogram (index 2)
 for i in [1, 2]:  # We do not need a minimum constraint for Phil & Sebastian (index 0)
-    for n in range(16):
+    for n in range(len(demands)):
         is_ordered = m.addVar(vtype=GRB.BINARY, name=f"is_ordered_{i}_{n}")
         m.addConstr(y[i, n] >= min_order_quantities[i] * is_ordered, name=f"min_order_{i}_{n}")
         m.addConstr(y[i, n] <= demands[n] * is_ordered, name=f"max_order_{i}_{n}")
@@ -37,7 +53,7 @@ m.optimize()
 # Output solution
 if m.status == GRB.OPTIMAL:
     print(f"Optimal amount of coffee to order in advance: {x.X} gallons at a cost of ${advance_order_cost * x.X}.")
-    for n in range(16):
+    for n in range(len(demands)):
         for i in range(3):
             if y[i, n].X > 0:
                 print(f"Order {y[i, n].X} gallons from supplier {i+1} in scenario {n+1} at a cost of ${supplier_costs[i] * y[i, n].X}.")
@@ -49,6 +65,14 @@ print("######################## PART F ######################")
 print(f"Optimal amount of coffee to order in advance: {x.X} gallons.")
 print(f"Optimal objective function value (total expected cost): ${m.ObjVal:.2f}.")
 
+# The same answer from the closed-form newsvendor solution (one sort over the
+# scenarios); newsvendor.py is in Model_Operations_Secondhalf, on PYTHONPATH
+import newsvendor
+
+breakpoints, intercept, slope = coffee_newsvendor(supplier_costs, min_order_quantities)
+x_fast, cost_fast = newsvendor.solve(demands, probabilities, advance_order_cost, breakpoints, intercept, slope)
+newsvendor.cross_check(x_fast, cost_fast, x.X, m.ObjVal)
+
 print("######################## PART G ######################")
 # Constants
 emergency_costs = [120, 105, 110]  # Phil & Sebastian, Rosso, Monogram
@@ -73,123 +97,50 @@ print(f"Price per gallon to order the maximum amount in advance: ${round(price_p
 
 
 print("######################## PART I ######################")
-import gurobipy as gp
-from gurobipy import GRB
+# stochastic.py and lshaped.py are in Model_Operations_Secondhalf, on PYTHONPATH
+from stochastic import analyze
+import lshaped
 
-# Data from the snippet
-probabilities = [0.09, 0.12, 0.10, 0.05, 0.16, 0.14, 0.03, 0.08, 0.05, 0.05, 0.04, 0.03, 0.02, 0.01, 0.02, 0.01]
-demands = [90, 95, 100, 105, 110, 115, 120, 125, 130, 135, 140, 145, 150, 155, 160, 165]
-supplier_costs = [120, 105, 110]  # Costs for Phil & Sebastian, Rosso, and Monogram respectively
-min_order_quantities = [0, 70, 40]  # Minimum order quantities for Rosso and Monogram
+# The coffee problem as a two-stage model with one recourse block per demand scenario
+first, scenarios, recourse_vtype = coffee_problem(demands, supplier_costs, advance_order_cost, min_order_quantities)
 
-# Perfect foresight models for each scenario
-perfect_foresight_costs = []
-for n, demand in enumerate(demands):
-    m_pf = gp.Model("Coffee_Supply_Perfect_Foresight_" + str(n))
-    
-    # Decision variables
-    y = m_pf.addVars(3, vtype=GRB.INTEGER, name=f"y_{n}")  # Emergency orders from each supplier
-    use = m_pf.addVars(2, vtype=GRB.BINARY, name=f"use_{n}")  # Binary variables for Rosso and Monogram
+# The number of worker processes for the perfect foresight problems
+WORKERS = 1
 
-    # Objective function to minimize cost for this scenario
-    total_cost_expr = gp.quicksum(supplier_costs[i] * y[i] for i in range(3))
-    m_pf.setObjective(total_cost_expr, GRB.MINIMIZE)
-
-    # Constraints
-    m_pf.addConstr(gp.quicksum(y[i] for i in range(3)) >= demand, name=f"Demand_{n}")
-
-    # Rosso Coffee minimum order constraints
-    m_pf.addConstr(y[1] >= 70 * use[0], name=f"MinOrder_Rosso_{n}")
-    m_pf.addGenConstrIndicator(use[0], True, y[1] >= 70, name=f"Activate_Rosso_{n}")
-    m_pf.addGenConstrIndicator(use[0], False, y[1] == 0, name=f"Deactivate_Rosso_{n}")
-
-    # Monogram Coffee minimum order constraints
-    m_pf.addConstr(y[2] >= 40 * use[1], name=f"MinOrder_Monogram_{n}")
-    m_pf.addGenConstrIndicator(use[1], True, y[2] >= 40, name=f"Activate_Monogram_{n}")
-    m_pf.addGenConstrIndicator(use[1], False, y[2] == 0, name=f"Deactivate_Monogram_{n}")
-
-    # Solve the model
-    m_pf.optimize()
-
-    # Store costs for each scenario, weighted by scenario probability
-    if m_pf.status == GRB.OPTIMAL:
-        perfect_foresight_costs.append(m_pf.objVal * probabilities[n])
-
-# Calculate WS (Wait-and-See)
-WS = sum(perfect_foresight_costs)
-
-# Stochastic Programming Solution (SP) from your original calculation
-SP = 11343.5  # Replace with m.objVal if available
+# Solve the stochastic problem (SP), the perfect foresight problem of every
+# scenario (WS) and the mean value problem and its expected result (EEV) in
+# one run that shares a single scenario model between the solves
+results = analyze(first, scenarios, probabilities, sense=GRB.MINIMIZE, recourse_vtype=recourse_vtype, workers=WORKERS)
 
 # Calculate EVPI
-EVPI = SP - WS
+SP = results["SP"]
+WS = results["WS"]
+EVPI = results["EVPI"]
 
 print("SP (Stochastic Programming Solution):", SP)
 print("WS (Wait-and-See Solution):", WS)
 print("EVPI (Expected Value of Perfect Information):", EVPI)
 
-print("######################## PART J ######################")
-import gurobipy as gp
-from gurobipy import GRB
-
-# Given data setup
-probabilities = [0.09, 0.12, 0.10, 0.05, 0.16, 0.14, 0.03, 0.08, 0.05, 0.05, 0.04, 0.03, 0.02, 0.01, 0.02, 0.01]
-demands = [90, 95, 100, 105, 110, 115, 120, 125, 130, 135, 140, 145, 150, 155, 160, 165]
-supplier_costs = [120, 105, 110]  # Costs for Phil & Sebastian, Rosso, and Monogram respectively
-advance_order_cost = 95
-
-# Calculate mean demand
-mean_demand = sum(p * d for p, d in zip(probabilities, demands))
-
-# Model setup for the deterministic mean value problem
-m_mean = gp.Model("Deterministic_Mean_Value_Problem")
-
-# Decision variables
-x_mean = m_mean.addVar(name="x_mean", vtype=GRB.CONTINUOUS)  # Base order
-
-# Objective function to minimize cost
-m_mean.setObjective(advance_order_cost * x_mean, GRB.MINIMIZE)
-
-# Constraint to ensure demand is met using average demand
-m_mean.addConstr(x_mean >= mean_demand, "AverageDemand")
-
-# Solve the model
-m_mean.optimize()
+# The same stochastic problem by the L-shaped method, which builds the
+# scenarios batch by batch and so also handles thousands of demand scenarios.
+# It still solves scenario MIPs in every iteration; for the coffee order alone
+# newsvendor.solve (Part F) is far faster at any number of scenarios.
+BATCH_SIZE = 1000
+x_ls, upper, lower = lshaped.solve(first, partial(coffee_batch, demands, supplier_costs=supplier_costs,
+                                                  min_order_quantities=min_order_quantities),
+                                   probabilities, batch_size=BATCH_SIZE, workers=WORKERS,
+                                   recourse_vtype=recourse_vtype, first_ub=max(demands), verbose=False)
+print("L-shaped advance order:", x_ls[0])
+print("L-shaped bounds on SP:", lower, upper)
 
-print("Objective for the Average:", m_mean.objVal)
-
-# Step 2: stochastic solution holding first-stage variables fixed
-# Create a new optimization model
-m_stochastic = gp.Model("Stochastic_Model")
-
-# Use first-stage decisions from the mean value problem
-fs_x = x_mean.X
-
-# Scenario-specific decision variables
-y = m_stochastic.addVars(3, 16, vtype=GRB.CONTINUOUS, name="y")  # Emergency orders
-
-# Objective function to minimize total expected cost
-objective = gp.quicksum(probabilities[n] * (advance_order_cost * fs_x + sum(supplier_costs[i] * y[i, n] for i in range(3))) for n in range(16))
-m_stochastic.setObjective(objective, GRB.MINIMIZE)
-
-# Constraints for each scenario
-for n in range(16):
-    m_stochastic.addConstr(fs_x + gp.quicksum(y[i, n] for i in range(3)) >= demands[n], name=f"Demand_{n}")
-
-# Solve our model
-m_stochastic.optimize()
-
-print("Objective for the Stochastic Solution:", m_stochastic.objVal)
-
-# EEV from the mean value problem
-EEV = m_mean.objVal
-
-# SP from the stochastic model
-SP = m_stochastic.objVal
+print("######################## PART J ######################")
+# The mean value problem and its advance order evaluated in every scenario
+print("Objective for the Average:", results["EV"])
+print("Advance order in the mean value problem:", results["x_ev"][0])
 
-# Calculate VSS
-VSS = abs(EEV - SP)
+EEV = results["EEV"]
+VSS = results["VSS"]
 
-print("EEV (Expected Ex-Post Value):", EEV)
-print("SP (Expected Value of Stochastic Solution):", SP)
+print("EEV (Expected Result of the Expected Value Solution):", EEV)
+print("SP (Stochastic Programming Solution):", SP)
 print("VSS (Value of Stochastic Solution):", VSS)
@@ -0,0 +1,74 @@
+import numpy as np
+import scipy.sparse as sp
+from gurobipy import GRB
+
+# The functions below build on benders.py, newsvendor.py and stochastic.py
+# from Model_Operations_Secondhalf and import them when called, so only the
+# parts of Question2.py that use them need that directory on PYTHONPATH (run
+# from the repository root with PYTHONPATH=Model_Operations_Secondhalf).
+
+# Data from the snippet
+probabilities = [0.09, 0.12, 0.10, 0.05, 0.16, 0.14, 0.03, 0.08, 0.05, 0.05, 0.04, 0.03, 0.02, 0.01, 0.02, 0.01]
+demands = [90, 95, 100, 105, 110, 115, 120, 125, 130, 135, 140, 145, 150, 155, 160, 165]
+supplier_costs = [120, 105, 110]  # Costs for Phil & Sebastian, Rosso, and Monogram respectively
+advance_order_cost = 95
+min_order_quantities = [0, 70, 40]  # Minimum order quantities for Phil & Sebastian, Rosso, and Monogram
+
+
+# The coffee supply problem as a two-stage model: the advance order x in the
+# first stage; the emergency orders y from each supplier and the binaries
+# is_ordered for Rosso and Monogram in the second. Returns the first stage,
+# one recourse block per demand scenario and the recourse variable types.
+def coffee_problem(demands=demands, supplier_costs=supplier_costs, advance_order_cost=advance_order_cost,
+                   min_order_quantities=min_order_quantities):
+    from stochastic import FirstStage
+
+    first = FirstStage(np.array([advance_order_cost], dtype=float), None, None, None, GRB.CONTINUOUS)
+    scenarios = coffee_batch(demands, 0, len(demands), supplier_costs, min_order_quantities)
+    recourse_vtype = np.array([GRB.CONTINUOUS] * 3 + [GRB.BINARY] * 2)
+    return first, scenarios, recourse_vtype
+
+
+# The recourse blocks of the demand scenarios start..stop-1. An emergency
+# order never exceeds the largest demand, which bounds the orders of the
+# suppliers with a minimum order quantity.
+def coffee_batch(demands, start, stop, supplier_costs=supplier_costs, min_order_quantities=min_order_quantities):
+    from benders import Block
+
+    big_m = max(demands)
+
+    # Recourse variables: y[0], y[1], y[2], is_ordered[1], is_ordered[2]
+    matrix = sp.csr_matrix(np.array([[1, 1, 1, 0, 0],
+                                     [0, 1, 0, -min_order_quantities[1], 0],
+                                     [0, 1, 0, -big_m, 0],
+                                     [0, 0, 1, 0, -min_order_quantities[2]],
+                                     [0, 0, 1, 0, -big_m]], dtype=float))
+    sense = np.array([">", ">", "<", ">", "<"])
+    cost = np.array(list(supplier_costs) + [0, 0], dtype=float)
+
+    # Demand satisfaction: the advance order plus the emergency orders cover the demand
+    link = sp.csr_matrix(np.array([[1.0], [0.0], [0.0], [0.0], [0.0]]))
+    return [Block(cost, matrix, sense, np.array([d, 0, 0, 0, 0], dtype=float), link) for d in demands[start:stop]]
+
+
+# The coffee recourse as a newsvendor: when the advance order falls short by
+# s gallons, it is cheapest to order everything from one supplier (moving
+# volume to a cheaper supplier never breaks its minimum), so the recourse
+# cost is R(s) = min_i supplier_costs[i] * max(s, min_order_quantities[i]).
+# R is linear between the minimum order quantities and the points where a
+# supplier's minimum order costs as much as ordering s from another.
+def coffee_newsvendor(supplier_costs=supplier_costs, min_order_quantities=min_order_quantities):
+    from newsvendor import linearize
+
+    costs = np.asarray(supplier_costs, dtype=float)
+    minimums = np.asarray(min_order_quantities, dtype=float)
+
+    def recourse(s):
+        s = np.asarray(s, dtype=float)
+        cost = np.min(costs[None, :] * np.maximum(s[:, None], minimums[None, :]), axis=1)
+        return np.where(s > 0, cost, 0.0)
+
+    kinks = np.concatenate([minimums, (costs[None, :] * minimums[None, :] / costs[:, None]).ravel()])
+    breakpoints = np.concatenate([[-np.inf, 0.0], np.unique(kinks[kinks > 0]), [np.inf]])
+    intercept, slope = linearize(recourse, breakpoints)
+    return breakpoints, intercept, slope
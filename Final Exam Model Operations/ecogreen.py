@@ -0,0 +1,107 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from gurobipy import Model, GRB
+
+
+# Pull the model data out of the supply and demand tables once as NumPy arrays
+def extract_data(supply_data, demand_data):
+    num_provinces = demand_data.shape[0]
+    fixed = supply_data['Fixed'].to_numpy(dtype=float)
+    capacity = supply_data['Capacity'].to_numpy(dtype=float)
+    cost = supply_data[[f'Province {j+1}' for j in range(num_provinces)]].to_numpy(dtype=float)
+    demand = demand_data['Demand'].to_numpy(dtype=float)
+    return fixed, capacity, cost, demand
+
+
+# Build the EcoGreen facility location model with matrix variables and sparse
+# constraint blocks. This is the same model as the term-by-term version in
+# Question1.py, but no Python expression is created per (site, province) cell.
+def build_model(supply_data, demand_data, name="EcoGreen Energy Expansion"):
+    start = time.perf_counter()
+
+    fixed, capacity, cost, demand = extract_data(supply_data, demand_data)
+    num_sites, num_provinces = cost.shape
+
+    model = Model(name)
+
+    # Decision Variables
+    x = model.addMVar(num_sites, vtype=GRB.BINARY, name="Open")
+    y = model.addMVar((num_sites, num_provinces), vtype=GRB.CONTINUOUS, name="Energy_Transferred")
+    y_flat = y.reshape(-1)
+
+    # Objective Function: Minimize total costs
+    model.setObjective(fixed @ x + cost.ravel() @ y_flat, GRB.MINIMIZE)
+
+    # Sparse blocks that sum the row-major flattened flows by site and by province
+    site_sum = sp.kron(sp.identity(num_sites, format='csr'), np.ones((1, num_provinces)), format='csr')
+    province_sum = sp.kron(np.ones((1, num_sites)), sp.identity(num_provinces, format='csr'), format='csr')
+
+    constrs = {}
+
+    # Capacity constraints
+    constrs["Capacity"] = model.addConstr(site_sum @ y_flat - capacity * x <= 0, name="Capacity")
+
+    # Demand constraints
+    constrs["Demand"] = model.addConstr(province_sum @ y_flat >= demand, name="Demand")
+
+    # Mutual Exclusivity and Dependency
+    constrs["Mutual_Exclusivity_10_15"] = model.addConstr(x[9] <= 1 - x[14], name="Mutual_Exclusivity_10_15")
+    constrs["Mutual_Exclusivity_20_15"] = model.addConstr(x[19] <= 1 - x[14], name="Mutual_Exclusivity_20_15")
+    constrs["Mutual_Exclusivity_15_20"] = model.addConstr(x[14] <= 1 - x[19], name="Mutual_Exclusivity_15_20")
+    constrs["Dependency_3_4_5"] = model.addConstr(2 * x[2] <= x[3] + x[4], name="Dependency_3_4_5")
+    constrs["Dependency_5_on_8_9"] = model.addConstr(x[4] <= x[7] + x[8], name="Dependency_5_on_8_9")
+
+    # Regional Plant Limits
+    constrs["Regional_Limits"] = model.addConstr(x[:10].sum() <= 2 * x[10:20].sum(), name="Regional_Limits")
+
+    # Energy Output Mix
+    constrs["Minimum_Output"] = model.addConstr(y[:5].sum() >= 0.3 * y.sum(), name="Minimum_Output")
+
+    # Provincial Energy Caps
+    caps = np.broadcast_to(0.5 * demand, (num_sites, num_provinces))
+    constrs["Max_Energy_Per_Province"] = model.addConstr(y <= caps, name="Max_Energy_Per_Province")
+
+    model.update()
+
+    # Keep the build time on the model so callers can report it
+    model._build_time = time.perf_counter() - start
+
+    return model, x, y, constrs
+
+
+# The EcoGreen model in the form taken by the Benders engine in
+# Model_Operations_Secondhalf/benders.py: the fixed costs, the flow block and
+# the rules that only involve the open/close decisions. Only this function
+# needs that directory, on PYTHONPATH (run from the repository root with
+# PYTHONPATH=Model_Operations_Secondhalf).
+def benders_instance(supply_data, demand_data):
+    from benders import add_rows, facility_location
+
+    fixed, capacity, cost, demand = extract_data(supply_data, demand_data)
+    num_sites, num_provinces = cost.shape
+
+    # Flows with the provincial energy caps as per-arc upper bounds
+    block = facility_location(capacity, cost, demand, arc_cap=np.broadcast_to(0.5 * demand, cost.shape))
+
+    # Energy Output Mix: the first five sites supply at least 30% of all energy
+    mix = np.full((num_sites, num_provinces), -0.3)
+    mix[:5] += 1.0
+    block = add_rows(block, mix.reshape(1, -1), '>', 0.0)
+
+    def site_rules(model, x):
+        # Mutual Exclusivity and Dependency
+        model.addConstr(x[9] <= 1 - x[14], name="Mutual_Exclusivity_10_15")
+        model.addConstr(x[19] <= 1 - x[14], name="Mutual_Exclusivity_20_15")
+        model.addConstr(x[14] <= 1 - x[19], name="Mutual_Exclusivity_15_20")
+        model.addConstr(2 * x[2] <= x[3] + x[4], name="Dependency_3_4_5")
+        model.addConstr(x[4] <= x[7] + x[8], name="Dependency_5_on_8_9")
+
+        # Regional Plant Limits
+        model.addConstr(x[:10].sum() <= 2 * x[10:20].sum(), name="Regional_Limits")
+
+        # The open sites must be able to cover the total demand (saves feasibility cuts)
+        model.addConstr(capacity @ x >= demand.sum(), name="Total_Capacity")
+
+    return fixed, [block], [site_rules]
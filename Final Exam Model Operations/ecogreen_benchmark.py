@@ -0,0 +1,73 @@
+import csv
+import multiprocessing
+import resource
+import sys
+import time
+
+from ecogreen import build_model
+from ecogreen_instances import generate
+
+# The grid of instance sizes (sites, provinces) and seeds to run
+SIZES = [(20, 5), (50, 10), (100, 20), (200, 40), (500, 50)]
+SEEDS = [0, 1, 2]
+
+# The time limit for each solve (s) and where to write the results
+TIME_LIMIT = 300
+OUTPUT = 'ecogreen_benchmark.csv'
+
+FIELDS = ['sites', 'provinces', 'seed', 'build_seconds', 'variables', 'constraints',
+          'presolve_variables', 'presolve_constraints', 'solve_seconds', 'status',
+          'objective', 'mip_gap', 'peak_rss_mb']
+
+
+# The peak RSS of this process in MB (ru_maxrss is in bytes on macOS and in
+# kilobytes on Linux)
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+# Build, presolve and solve one generated instance. Each run happens in its
+# own worker process so that the peak RSS belongs to that instance alone.
+def run(args):
+    num_sites, num_provinces, seed = args
+    supply_data, demand_data = generate(num_sites, num_provinces, seed)
+
+    model, x, y, constrs = build_model(supply_data, demand_data)
+    model.Params.OutputFlag = 0
+    model.Params.TimeLimit = TIME_LIMIT
+
+    # The size of the model after Gurobi's presolve
+    presolved = model.presolve()
+
+    start = time.perf_counter()
+    model.optimize()
+    solve_seconds = time.perf_counter() - start
+
+    return {'sites': num_sites,
+            'provinces': num_provinces,
+            'seed': seed,
+            'build_seconds': model._build_time,
+            'variables': model.NumVars,
+            'constraints': model.NumConstrs,
+            'presolve_variables': presolved.NumVars,
+            'presolve_constraints': presolved.NumConstrs,
+            'solve_seconds': solve_seconds,
+            'status': model.Status,
+            'objective': model.ObjVal if model.SolCount > 0 else None,
+            'mip_gap': model.MIPGap if model.SolCount > 0 else None,
+            'peak_rss_mb': peak_rss_mb()}
+
+
+if __name__ == '__main__':
+    grid = [(n, m, seed) for n, m in SIZES for seed in SEEDS]
+
+    # One fresh process per instance, run one after another so timings do not interfere
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool, open(OUTPUT, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in pool.imap(run, grid):
+            writer.writerow(row)
+            f.flush()
+            print(f"{row['sites']} sites x {row['provinces']} provinces (seed {row['seed']}): "
+                  f"build {row['build_seconds']:.3f}s, solve {row['solve_seconds']:.3f}s, "
+                  f"status {row['status']}, gap {row['mip_gap']}")
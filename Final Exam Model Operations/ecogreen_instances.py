@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+
+# Generate a seeded random EcoGreen instance with the same column layout as
+# ecogreen_energy_supply.csv (Fixed, Capacity, Province k) and
+# ecogreen_energy_demand.csv (Demand). The side rules in Question1.py refer to
+# sites 1-20, so an instance has at least 20 sites. Capacities are drawn so
+# that the instance stays feasible: the first five sites can cover the 30%
+# output mix and every province can be served under the 50% cap.
+def generate(num_sites, num_provinces, seed=0):
+    if num_sites < 20:
+        raise ValueError("EcoGreen instances need at least 20 sites")
+    rng = np.random.default_rng(seed)
+
+    # Provincial demand
+    demand = rng.integers(500, 2000, num_provinces)
+    total_demand = demand.sum()
+
+    # Site capacities total about three times the demand; the first five sites
+    # hold at least 10% of the demand each
+    capacity = rng.uniform(0.5, 1.5, num_sites) * 3 * total_demand / num_sites
+    capacity[:5] = np.maximum(capacity[:5], 0.1 * total_demand)
+
+    # Fixed costs grow with capacity; unit costs are spread per site and province
+    fixed = capacity * rng.uniform(5, 15, num_sites)
+    cost = rng.uniform(10, 100, (num_sites, num_provinces))
+
+    supply_data = pd.DataFrame({'Site': np.arange(1, num_sites + 1),
+                                'Fixed': fixed.round(2),
+                                'Capacity': capacity.round(2)})
+    for j in range(num_provinces):
+        supply_data[f'Province {j+1}'] = cost[:, j].round(2)
+    demand_data = pd.DataFrame({'Province': np.arange(1, num_provinces + 1), 'Demand': demand})
+    return supply_data, demand_data
+
+
+# Write a generated instance to a pair of CSV files
+def write(supply_path, demand_path, num_sites, num_provinces, seed=0):
+    supply_data, demand_data = generate(num_sites, num_provinces, seed)
+    supply_data.to_csv(supply_path, index=False)
+    demand_data.to_csv(demand_path, index=False)
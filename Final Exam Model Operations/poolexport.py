@@ -0,0 +1,79 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# The layout of one exported plan: the packed open-site bitmask, the number of
+# open sites, the pool solution it came from and its objective value
+SCHEMA = pa.schema([
+    ('plan', pa.binary()),
+    ('num_open', pa.int32()),
+    ('solution', pa.int32()),
+    ('objective', pa.float64()),
+])
+
+
+# The binary site variables as a flat list, from an MVar or a tupledict
+def _site_vars(x):
+    if isinstance(x, dict):
+        return list(x.values())
+    return list(np.ravel(np.array(x.tolist(), dtype=object)))
+
+
+# The number of pool members within PoolGap of the best solution. The pool
+# can also hold worse solutions found on the way; it is ordered best first,
+# so the members within the gap are its leading ones.
+def within_gap(model):
+    limit = model.Params.PoolGap * abs(model.ObjVal)
+    for n in range(model.SolCount):
+        model.setParam('SolutionNumber', n)
+        if model.ModelSense * (model.PoolObjVal - model.ObjVal) > limit:
+            break
+    else:
+        n = model.SolCount
+    model.setParam('SolutionNumber', 0)
+    return n
+
+
+# Stream the pool members within PoolGap of a solved model to a Parquet file.
+# Each member is read with one vectorized Xn call over the site variables and
+# written as a compact row. Plans that open the same sites and only differ in
+# their continuous flows are written once; the pool is ordered best first, so
+# the row kept is the cheapest one. At most batch_size rows are held in memory.
+def export_pool(model, x, path, batch_size=1024):
+    sites = _site_vars(x)
+    seen = set()
+    batch = {name: [] for name in SCHEMA.names}
+    written = 0
+
+    with pq.ParquetWriter(path, SCHEMA) as writer:
+        for n in range(within_gap(model)):
+            model.setParam('SolutionNumber', n)
+            is_open = np.asarray(model.getAttr('Xn', sites)) > 0.5
+            plan = np.packbits(is_open).tobytes()
+            if plan in seen:
+                continue
+            seen.add(plan)
+
+            batch['plan'].append(plan)
+            batch['num_open'].append(int(is_open.sum()))
+            batch['solution'].append(n)
+            batch['objective'].append(model.PoolObjVal)
+
+            if len(batch['plan']) == batch_size:
+                writer.write_table(pa.table(batch, schema=SCHEMA))
+                written += batch_size
+                batch = {name: [] for name in SCHEMA.names}
+
+        if batch['plan']:
+            writer.write_table(pa.table(batch, schema=SCHEMA))
+            written += len(batch['plan'])
+
+    model.setParam('SolutionNumber', 0)
+    return written
+
+
+# Turn a packed plan back into the indices of the open sites
+def open_sites(plan, num_sites):
+    bits = np.unpackbits(np.frombuffer(plan, dtype=np.uint8), count=num_sites)
+    return np.flatnonzero(bits)
@@ -0,0 +1,57 @@
+import numpy as np
+from gurobipy import GRB, Constr
+
+
+# Flatten a constraint family (a single Constr, an MConstr or the tupledict
+# returned by addConstrs) into a plain list of Constr objects
+def family_members(family):
+    if isinstance(family, Constr):
+        return [family]
+    if isinstance(family, dict):
+        return list(family.values())
+    return list(np.ravel(np.array(family.tolist(), dtype=object)))
+
+
+# Switch a named constraint family on or off in bulk. Switching off relaxes
+# every member by moving its RHS to +/- infinity, so the model keeps the same
+# rows and the previous solution stays feasible for the re-solve. The original
+# senses and right-hand sides are stored on the model so they can be restored.
+def set_family(model, constrs, name, active):
+    members = family_members(constrs[name])
+    if not hasattr(model, '_relaxed'):
+        model._relaxed = {}
+
+    if not active and name not in model._relaxed:
+        senses = model.getAttr('Sense', members)
+        rhs = model.getAttr('RHS', members)
+        model._relaxed[name] = (senses, rhs)
+        relaxed_rhs = [-GRB.INFINITY if s == GRB.GREATER_EQUAL else GRB.INFINITY for s in senses]
+        relaxed_senses = [GRB.LESS_EQUAL if s == GRB.EQUAL else s for s in senses]
+        model.setAttr('Sense', members, relaxed_senses)
+        model.setAttr('RHS', members, relaxed_rhs)
+    elif active and name in model._relaxed:
+        senses, rhs = model._relaxed.pop(name)
+        model.setAttr('Sense', members, senses)
+        model.setAttr('RHS', members, rhs)
+
+
+# Hand the current solution to the next solve as a MIP start. Continuous
+# models keep their basis across RHS changes without any help.
+def warm_start(model):
+    if model.SolCount > 0 and model.IsMIP:
+        variables = model.getVars()
+        model.setAttr('Start', variables, model.getAttr('X', variables))
+
+
+# Run a what-if scenario: switch the given families off (and any others back
+# on), re-solve from the previous solution and return the objective value.
+# A name that is not one of the families is an error rather than a no-op.
+def what_if(model, constrs, off=()):
+    unknown = [name for name in off if name not in constrs]
+    if unknown:
+        raise KeyError("Unknown constraint families: %s" % ", ".join(map(str, unknown)))
+    warm_start(model)
+    for name in constrs:
+        set_family(model, constrs, name, name not in off)
+    model.optimize()
+    return model.ObjVal if model.SolCount > 0 else None
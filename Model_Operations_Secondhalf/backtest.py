@@ -0,0 +1,85 @@
+import time
+
+import numpy as np
+import pandas as pd
+from gurobipy import GRB
+
+from markowitz import build_model
+
+
+# The mean and covariance of every window of days in returns (a days x assets
+# matrix) ending at window, window + step, ... The window slides by step days
+# at a time with rank-step updates of the column sums and of the cross-product
+# matrix R^T R (the new days added, the oldest days dropped), so each slide
+# costs O(step n^2) instead of O(window n^2).
+#
+# Yields the end of the window (exclusive), the mean and the covariance.
+def rolling_moments(returns, window, step):
+    R = np.asarray(returns, dtype=float)
+    total = R[:window].sum(axis=0)
+    cross = R[:window].T @ R[:window]
+
+    end = window
+    while end <= len(R):
+        mean = total / window
+        yield end, mean, (cross - window * np.outer(mean, mean)) / (window - 1)
+
+        added = R[end:end + step]
+        dropped = R[end - window:end - window + len(added)]
+        total += added.sum(axis=0) - dropped.sum(axis=0)
+        cross += added.T @ added - dropped.T @ dropped
+        end += step
+
+
+# Backtest the minimum-risk portfolio: every step days the portfolio is
+# rebalanced to the minimum-variance weights of the last window days and held
+# (without trading) for the next step days. One model is built for the first
+# window; later windows only replace its quadratic objective in place and
+# are solved with simplex from the previous basis.
+#
+# Returns a frame with one row per rebalance (indexed by its date when dates
+# are given): the realized return of the holding period, the turnover (sum of
+# absolute weight changes against the drifted weights), the time to build
+# the model (first window) or replace its objective (later windows) and the
+# solve time, together with the weights of every rebalance (one row each).
+def backtest(returns, window=504, step=21, dates=None, threads=1):
+    R = np.asarray(returns, dtype=float)
+    num_rebalances = max(0, -(-(len(R) - window) // step))
+    realized = np.empty(num_rebalances)
+    turnover = np.empty(num_rebalances)
+    build_seconds = np.empty(num_rebalances)
+    solve_seconds = np.empty(num_rebalances)
+    weights = np.empty((num_rebalances, R.shape[1]))
+
+    model = x = None
+    drifted = np.zeros(R.shape[1])
+    for k, (end, mean, cov) in enumerate(rolling_moments(R, window, step)):
+        if k == num_rebalances:
+            break
+
+        start = time.perf_counter()
+        if model is None:
+            model, x, constrs = build_model(mean, cov)
+            model.Params.OutputFlag = 0
+            model.Params.Threads = threads
+            model.Params.Method = 1
+        else:
+            model.setMObjective(cov, None, 0.0, x, x, None, GRB.MINIMIZE)
+            model.update()
+        build_seconds[k] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model.optimize()
+        solve_seconds[k] = time.perf_counter() - start
+
+        # Hold the new weights over the next days and let them drift
+        weights[k] = x.X
+        growth = np.prod(1 + R[end:end + step], axis=0)
+        realized[k] = weights[k] @ growth - 1
+        turnover[k] = np.abs(weights[k] - drifted).sum()
+        drifted = weights[k] * growth / (weights[k] @ growth)
+
+    index = None if dates is None else pd.Index(dates)[window:window + step * num_rebalances:step]
+    results = pd.DataFrame({"return": realized, "turnover": turnover, "build_seconds": build_seconds,
+                            "solve_seconds": solve_seconds}, index=index)
+    return results, weights
@@ -0,0 +1,229 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gb
+from gurobipy import GRB
+
+# One recourse block of a two-stage model with binary open/close decisions x:
+#
+#     min cost @ y   s.t.   matrix @ y  (sense)  rhs - link @ x,   y >= 0
+#
+# The rows can mix '<', '>' and '=' senses. Capacity rows that only hold when
+# a site is open carry the site's capacity in the link matrix.
+Block = namedtuple("Block", ["cost", "matrix", "sense", "rhs", "link"])
+
+
+# Build the flow block of a capacitated facility location model with sites i
+# and customers j. The flows y[i, j] are flattened row by row, so the flow
+# from site i to customer j is column i*num_customers + j.
+def facility_location(capacity, cost, demand, arc_cap=None):
+    num_sites, num_customers = cost.shape
+    site_sum = sp.kron(sp.identity(num_sites, format="csr"), np.ones((1, num_customers)), format="csr")
+    customer_sum = sp.kron(np.ones((1, num_sites)), sp.identity(num_customers, format="csr"), format="csr")
+
+    # Capacity rows (only open sites can ship) followed by the demand rows
+    matrix = [site_sum, customer_sum]
+    sense = [np.full(num_sites, "<"), np.full(num_customers, ">")]
+    rhs = [np.zeros(num_sites), np.asarray(demand, dtype=float)]
+    link = [-sp.diags(np.asarray(capacity, dtype=float), format="csr"), sp.csr_matrix((num_customers, num_sites))]
+
+    # Optional upper bounds on each flow, kept as rows so their duals enter the cuts
+    if arc_cap is not None:
+        matrix.append(sp.identity(num_sites * num_customers, format="csr"))
+        sense.append(np.full(num_sites * num_customers, "<"))
+        rhs.append(np.asarray(arc_cap, dtype=float).ravel())
+        link.append(sp.csr_matrix((num_sites * num_customers, num_sites)))
+
+    return Block(np.asarray(cost, dtype=float).ravel(), sp.vstack(matrix, format="csr"),
+                 np.concatenate(sense), np.concatenate(rhs), sp.vstack(link, format="csr"))
+
+
+# Add extra rows over the flows of a block, e.g. an output mix requirement
+def add_rows(block, matrix, sense, rhs, link=None):
+    matrix = sp.csr_matrix(matrix)
+    if link is None:
+        link = sp.csr_matrix((matrix.shape[0], block.link.shape[1]))
+    return Block(block.cost, sp.vstack([block.matrix, matrix], format="csr"),
+                 np.concatenate([block.sense, np.broadcast_to(sense, matrix.shape[0])]),
+                 np.concatenate([block.rhs, np.broadcast_to(rhs, matrix.shape[0])]),
+                 sp.vstack([block.link, sp.csr_matrix(link)], format="csr"))
+
+
+# Build the recourse block of the multi-period homecare model in
+# workforceplanning.py. The appointments, workers and hires become continuous
+# in the subproblem (the LP relaxation of the original integer recourse) and
+# the profit is negated so that the block is a minimization.
+def homecare_block(centers, regions, periods, workers, center_capacities, demands, hiring_cost,
+                   max_appointments_per_year, profit_per_appointment, max_hires=300):
+    C, R, T = len(centers), len(regions), len(periods)
+    num_flows = C * R * T
+
+    # Column indices of the appointments x[i, j, t], workers w[i, t] and hires h[i, t]
+    flow = np.arange(num_flows).reshape(C, R, T)
+    worker = num_flows + np.arange(C * T).reshape(C, T)
+    hire = num_flows + C * T + np.arange(C * T).reshape(C, T)
+
+    cost = np.zeros(num_flows + 2 * C * T)
+    cost[flow] = [[[-profit_per_appointment[i, j, t] for t in periods] for j in regions] for i in centers]
+    cost[hire] = hiring_cost
+
+    rows, cols, vals, sense, rhs = [], [], [], [], []
+    link_rows, link_cols, link_vals = [], [], []
+
+    def add_row(entries, row_sense, row_rhs):
+        r = len(rhs)
+        for c, v in entries:
+            rows.append(r)
+            cols.append(c)
+            vals.append(v)
+        sense.append(row_sense)
+        rhs.append(row_rhs)
+        return r
+
+    # All demand must be fully satisfied in every period
+    for b, j in enumerate(regions):
+        for s, t in enumerate(periods):
+            add_row([(flow[a, b, s], 1.0) for a in range(C)], "=", demands[j, t])
+
+    for a, i in enumerate(centers):
+        for s, t in enumerate(periods):
+
+            # Center capacities hold only if the center is open
+            r = add_row([(flow[a, b, s], 1.0) for b in range(R)], "<", 0.0)
+            link_rows.append(r)
+            link_cols.append(a)
+            link_vals.append(-center_capacities[i])
+
+            # Flow of workers per period
+            entries = [(worker[a, s], 1.0), (hire[a, s], -1.0)]
+            if s > 0:
+                entries.append((worker[a, s - 1], -1.0))
+            add_row(entries, "=", workers[i] if s == 0 else 0.0)
+
+            # Maximum number of hires per year
+            add_row([(hire[a, s], 1.0)], "<", max_hires)
+
+            # Appointments are limited by the number of workers at a center
+            add_row([(flow[a, b, s], 1.0) for b in range(R)] + [(worker[a, s], -max_appointments_per_year)], "<", 0.0)
+
+    matrix = sp.csr_matrix((vals, (rows, cols)), shape=(len(rhs), len(cost)))
+    link = sp.csr_matrix((link_vals, (link_rows, link_cols)), shape=(len(rhs), C))
+    return Block(cost, matrix, np.array(sense), np.array(rhs, dtype=float), link)
+
+
+# The recourse LP of one block. It is built once and only its RHS changes
+# between master solutions, so each re-solve starts from the previous basis.
+def _subproblem(block, threads):
+    sub = gb.Model("Benders Subproblem")
+    sub.Params.OutputFlag = 0
+    sub.Params.InfUnbdInfo = 1
+    sub.Params.Threads = threads
+    y = sub.addMVar(len(block.cost), lb=0.0, name="y")
+    sub.setObjective(block.cost @ y, GRB.MINIMIZE)
+    constrs = sub.addMConstr(block.matrix, y, block.sense, block.rhs)
+    return sub, y, constrs
+
+
+# Solve one block at the master solution x_val and return a cut in the form
+# intercept + slope @ x. For an optimality cut theta >= intercept + slope @ x;
+# for a feasibility cut 0 >= intercept + slope @ x (from the Farkas ray).
+def _cut(block, sub, constrs, x_val):
+    constrs.RHS = block.rhs - block.link @ x_val
+    sub.optimize()
+    if sub.Status == GRB.OPTIMAL:
+        pi = constrs.Pi
+        return True, sub.ObjVal, pi @ block.rhs, -(block.link.T @ pi)
+    farkas = constrs.FarkasDual
+    return False, None, -(farkas @ block.rhs), block.link.T @ farkas
+
+
+# Solve a two-stage model with binary first-stage decisions by Benders
+# decomposition. The master holds the open/close binaries x and one recourse
+# estimate theta[k] per block; the blocks are solved as LPs and their cuts are
+# added through a lazy-constraint callback on every new incumbent. Before
+# branching, a few rounds of cuts are generated on the master's LP relaxation.
+#
+# fixed:  fixed cost of opening each site
+# blocks: the recourse blocks (see Block)
+# rules:  functions rule(model, x) adding side constraints on the binaries
+#
+# Returns the objective, the open/close decisions and the flows of each block.
+def solve(fixed, blocks, rules=(), time_limit=None, root_rounds=20, tol=1e-6, threads=1, verbose=True):
+    start = time.perf_counter()
+    fixed = np.asarray(fixed, dtype=float)
+    num_sites = len(fixed)
+
+    # The master problem over the open/close binaries
+    master = gb.Model("Benders Master")
+    master.Params.OutputFlag = int(verbose)
+    x = master.addMVar(num_sites, vtype=GRB.BINARY, name="Open")
+    theta_lb = [0.0 if np.all(b.cost >= 0) else -GRB.INFINITY for b in blocks]
+    theta = master.addMVar(len(blocks), lb=theta_lb, name="Recourse")
+    master.setObjective(fixed @ x + theta.sum(), GRB.MINIMIZE)
+    for rule in rules:
+        rule(master, x)
+    master.update()
+
+    subproblems = [_subproblem(b, threads) for b in blocks]
+    x_vars = x.tolist()
+    theta_vars = theta.tolist()
+    master._cuts = 0
+
+    # Solve every block at x_val and collect the cuts that x_val, theta_val violate
+    def separate(x_val, theta_val):
+        cuts = []
+        for k, (block, (sub, _, constrs)) in enumerate(zip(blocks, subproblems)):
+            optimal, value, intercept, slope = _cut(block, sub, constrs, x_val)
+            if optimal and value <= theta_val[k] + tol * max(1.0, abs(value)):
+                continue
+            lhs = gb.LinExpr(slope.tolist(), x_vars) + intercept
+            cuts.append(theta_vars[k] >= lhs if optimal else lhs <= 0)
+        master._cuts += len(cuts)
+        return cuts
+
+    # Kelley cutting-plane rounds on the LP relaxation of the master, starting
+    # from every site open so that each theta gets a bound before the first solve
+    x_val, theta_val = np.ones(num_sites), np.full(len(blocks), -np.inf)
+    master.setAttr("VType", x_vars, [GRB.CONTINUOUS] * num_sites)
+    for _ in range(root_rounds):
+        cuts = separate(x_val, theta_val)
+        if not cuts:
+            break
+        for cut in cuts:
+            master.addConstr(cut)
+        master.optimize()
+        if master.Status != GRB.OPTIMAL:
+            break
+        x_val, theta_val = x.X, theta.X
+    master.setAttr("VType", x_vars, [GRB.BINARY] * num_sites)
+
+    # Lazy cuts on every integer solution found during branch and bound
+    def callback(model, where):
+        if where == GRB.Callback.MIPSOL:
+            x_val = np.array(model.cbGetSolution(x_vars))
+            theta_val = np.array(model.cbGetSolution(theta_vars))
+            for cut in separate(x_val, theta_val):
+                model.cbLazy(cut)
+
+    master.Params.LazyConstraints = 1
+    if time_limit is not None:
+        master.Params.TimeLimit = max(0.0, time_limit - (time.perf_counter() - start))
+    master.optimize(callback)
+
+    if master.SolCount == 0:
+        return None, None, None
+
+    # Recover the flows of each block at the best open/close decisions
+    x_val = np.round(x.X)
+    flows = []
+    for block, (sub, y, constrs) in zip(blocks, subproblems):
+        _cut(block, sub, constrs, x_val)
+        flows.append(y.X)
+
+    if verbose:
+        print("Benders cuts added: ", master._cuts)
+        print("Benders runtime (s): ", time.perf_counter() - start)
+
+    return master.ObjVal, x_val, flows
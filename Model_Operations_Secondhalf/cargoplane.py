@@ -1,5 +1,6 @@
 from gurobipy import GRB
 import gurobipy as gb
+from scenarioreduction import fast_forward
 
 # Problem parameters
 p = [0.05, 0.15, 0.10, 0.25, 0.30, 0.10, 0.05]
@@ -7,6 +8,16 @@ frozen = [0, 0, 4, 8, 12, 16, 20]
 refrigerated = [8, 16, 24, 32, 40, 48, 56]
 regular = [100, 90, 80, 70, 60, 50, 40]
 
+# How many scenarios to keep after scenario reduction (all of them: no reduction)?
+KEEP = len(p)
+
+if KEEP < len(p):
+    kept, p, error = fast_forward(list(zip(frozen, refrigerated, regular)), p, KEEP)
+    frozen = [frozen[n] for n in kept]
+    refrigerated = [refrigerated[n] for n in kept]
+    regular = [regular[n] for n in kept]
+    print("Scenario reduction error (Kantorovich distance): ", error)
+
 # Create a new optimization model to minimize costs
 model = gb.Model("CargoPlane")
 
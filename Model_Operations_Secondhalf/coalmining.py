@@ -1,5 +1,6 @@
 from gurobipy import GRB
 import gurobipy as gb
+from scenarioreduction import fast_forward
 
 # Create a new optimization model
 model = gb.Model("Coal Mining")
@@ -12,21 +13,33 @@ mining_scenarios = 6
 demand = [81,92,103,114,125]  # Daily energy demand (demand rate)
 mine = [5,10,15,20,25,30]   # The amount of coal mined (mining rate)
 
+# Every combination of demand and mining rate is equally likely
+grid = [(demand[i], mine[j]) for i in range(demand_scenarios) for j in range(mining_scenarios)]
+weights = [1.0/len(grid)] * len(grid)
+
+# How many scenarios to keep after scenario reduction (all of them: no reduction)?
+KEEP = len(grid)
+
+if KEEP < len(grid):
+    kept, weights, error = fast_forward(grid, weights, KEEP)
+    grid = [grid[s] for s in kept]
+    print("Scenario reduction error (Kantorovich distance): ", error)
+
 # Declare the recourse variable
 x = model.addVar(lb=0, ub=24, vtype=GRB.CONTINUOUS, name="Mining Hours")
-y = model.addVars(demand_scenarios, mining_scenarios, lb=0, vtype=GRB.CONTINUOUS, name="Recourse")
+y = model.addVars(len(grid), lb=0, vtype=GRB.CONTINUOUS, name="Recourse")
 
 #First-stage (Cost for total number of hours for first-stage)
 first_stage = 8800*x
 
-#Second-stage (cost of purchasing energy)
-second_stage = gb.quicksum(y[i,j] for i in range(demand_scenarios) for j in range(mining_scenarios))
+#Second-stage (cost of purchasing energy), as a total over the full grid of scenarios
+second_stage = demand_scenarios*mining_scenarios * gb.quicksum(weights[s]*y[s] for s in range(len(grid)))
 
 #Objective Function to minimize expected costs
 model.setObjective(first_stage + 2000.0/30.0 * second_stage, GRB.MINIMIZE)
 
 #Second-stage constraints 
-model.addConstrs((mine[j]*x + y[i,j] >= demand[i] for i in range(demand_scenarios) for j in range(mining_scenarios)), "Demand Satisfaction")
+model.addConstrs((grid[s][1]*x + y[s] >= grid[s][0] for s in range(len(grid))), "Demand Satisfaction")
 
 #Solve our model
 model.optimize()   
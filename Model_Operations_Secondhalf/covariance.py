@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+import numpy as np
+
+# A k-factor covariance model  sigma = B F B^T + diag(D):  the n x k factor
+# loadings B, the k x k factor covariance F and the n specific variances D.
+# It takes O(n k) memory, and markowitz.build_model() models its risk with
+# k auxiliary factor exposures instead of a dense n x n quadratic form.
+FactorModel = namedtuple("FactorModel", ["loadings", "factor_cov", "specific"])
+
+
+# The returns (one row per asset, one column per day) centered per asset,
+# as a days x assets matrix
+def _centered(returns):
+    returns = np.asarray(returns, dtype=float)
+    return (returns - returns.mean(axis=1, keepdims=True)).T
+
+
+# Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity
+# (Ledoit and Wolf, 2004): the shrinkage intensity is estimated from the data
+# and is close to one when there are few days for the number of assets.
+# Returns the shrunk covariance and the intensity.
+def ledoit_wolf(returns):
+    X = _centered(returns)
+    T, n = X.shape
+    S = X.T @ X / T
+
+    # Distance of S from the target, and the estimated error of S, which is
+    # the average distance of the daily outer products x x^T from S
+    scale = np.trace(S) / n
+    d2 = np.sum(S * S) - 2 * scale * np.trace(S) + scale * scale * n
+    norms = np.einsum("ij,ij->i", X, X)
+    b2 = min((norms @ norms / T - np.sum(S * S)) / T, d2)
+    shrinkage = b2 / d2 if d2 > 0 else 1.0
+
+    S *= 1 - shrinkage
+    S[np.diag_indices(n)] += shrinkage * scale
+    return S, shrinkage
+
+
+# A statistical k-factor model from the principal components of the returns:
+# the factors are the top k components, their covariance is diagonal and the
+# specific variances are what the factors leave of each asset's variance.
+# Only a thin SVD of the days x assets returns is computed, never n x n.
+def pca_factors(returns, k, min_specific=1e-10):
+    X = _centered(returns)
+    T = X.shape[0]
+    _, s, vt = np.linalg.svd(X, full_matrices=False)
+
+    loadings = vt[:k].T
+    factor_variances = s[:k] ** 2 / (T - 1)
+    variances = np.einsum("ij,ij->j", X, X) / (T - 1)
+    specific = np.maximum(variances - (loadings ** 2) @ factor_variances, min_specific)
+    return FactorModel(loadings, np.diag(factor_variances), specific)
+
+
+# The dense n x n covariance of a factor model (for small checks only)
+def dense(factors):
+    B, F, D = factors
+    return B @ F @ B.T + np.diag(D)
@@ -0,0 +1,48 @@
+import numpy as np
+import scipy.sparse as sp
+from gurobipy import GRB
+
+from benders import Block
+from stochastic import FirstStage
+
+# The yield per acre in the average, optimistic and pessimistic scenarios
+oat_yield = [4.25, 5.1, 3.4]
+maize_yield = [3.0, 3.6, 2.4]
+soybean_yield = [20.0, 24.0, 16.0]
+
+# The probability of each scenario (as in cropallocationstochastic.py)
+probabilities = [0.30, 0.25, 0.45]
+
+# Selling prices (oats, maize, soybean within quota, soybean above quota) and purchase prices (oats, maize)
+sell = [220, 260, 55, 26]
+purchase = [264, 312]
+
+
+# The farming problem as a two-stage model: acres planted in the first stage;
+# purchases and sales in the second. The recourse variables are ordered
+# (Purchased oats, Purchased maize, Sold oats, Sold maize, Sold soybean within
+# quota, Sold soybean above quota); the model maximizes profit.
+def farm_problem():
+
+    # Land capacity constraint on the acres of oats, maize and soybean
+    first = FirstStage(np.zeros(3), sp.csr_matrix(np.ones((1, 3))), np.array(["<"]), np.array([500.0]), GRB.CONTINUOUS)
+
+    # Cattle feed (oats and maize), soybean quota and soybean production rows
+    matrix = sp.csr_matrix(np.array([[1, 0, -1, 0, 0, 0],
+                                     [0, 1, 0, -1, 0, 0],
+                                     [0, 0, 0, 0, 1, 0],
+                                     [0, 0, 0, 0, 1, 1]], dtype=float))
+    sense = np.array([">", ">", "<", "="])
+    rhs = np.array([200.0, 260.0, 7000.0, 0.0])
+    cost = np.array([-purchase[0], -purchase[1]] + sell, dtype=float)
+
+    # The yields link the acres planted to the harvest in each row
+    scenarios = []
+    for k in range(len(probabilities)):
+        link = sp.csr_matrix(np.array([[oat_yield[k], 0, 0],
+                                       [0, maize_yield[k], 0],
+                                       [0, 0, 0],
+                                       [0, 0, -soybean_yield[k]]]))
+        scenarios.append(Block(cost, matrix, sense, rhs, link))
+
+    return first, scenarios
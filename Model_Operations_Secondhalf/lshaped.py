@@ -0,0 +1,295 @@
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gb
+from gurobipy import GRB
+
+from stochastic import scenario_model, set_scenario
+
+# L-shaped (Benders) method for two-stage models with many scenarios. The
+# master problem keeps the first-stage decisions x and one recourse estimate
+# theta per batch of scenarios (multi-cut) or a single estimate (aggregated
+# cut). The scenarios are never held all at once: make_batch(start, stop)
+# builds the recourse Blocks (see benders.py) of scenarios start..stop-1 when
+# they are needed, and the batches are solved by a pool of worker processes,
+# so memory grows with the batch size rather than the number of scenarios.
+#
+# With integer recourse variables the recourse LP relaxation only gives lower
+# bounding cuts. The first stage must then be integer and bounded: it is
+# written in binary in the master and the exact recourse values (from the
+# scenario MIPs) enter through Laporte-Louveaux integer optimality cuts. The
+# LP cuts are strengthened by re-solving their intercept as a scenario MIP in
+# which the first stage is a free copy priced at the cut slope (strengthened
+# Benders cuts), which keeps the slope but lifts the cut towards Q(x).
+# Each distinct scenario of a batch is solved once per iteration, and the
+# strengthening MIPs stop once they no longer separate. The method still
+# solves scenario MIPs in every iteration, so a single-product recourse like
+# the newsvendor is better left to newsvendor.solve.
+
+# The recourse models of a worker process (or of the main process when no
+# pool is used)
+_worker = {}
+
+
+def _init_worker(make_batch, first, first_ub, recourse_vtype, threads):
+    env = gb.Env(empty=True)
+    env.setParam("OutputFlag", 0)
+    env.setParam("Threads", threads)
+    env.start()
+    _worker.clear()
+    _worker.update(env=env, make_batch=make_batch, first=first, first_ub=first_ub, recourse_vtype=recourse_vtype)
+
+
+# The recourse LP (for cuts) and, with integer recourse, the recourse MIP (for
+# exact values). Both are built once per worker from the fixed recourse
+# matrix; every scenario only swaps in its costs and right-hand sides.
+def _recourse_models(block):
+    if "lp" not in _worker:
+        vtype = np.broadcast_to(_worker["recourse_vtype"], len(block.cost))
+
+        # Binaries keep their upper bound of one in the relaxation
+        lp = gb.Model("Recourse LP", env=_worker["env"])
+        y = lp.addMVar(len(block.cost), ub=np.where(vtype == GRB.BINARY, 1.0, GRB.INFINITY), name="y")
+        rows = lp.addMConstr(block.matrix, y, block.sense, block.rhs)
+        lp.Params.InfUnbdInfo = 1
+        _worker["lp"] = (lp, y, rows)
+
+        if np.any(vtype != GRB.CONTINUOUS):
+            mip = gb.Model("Recourse MIP", env=_worker["env"])
+            y = mip.addMVar(len(block.cost), vtype=vtype, name="y")
+            rows = mip.addMConstr(block.matrix, y, block.sense, block.rhs)
+            _worker["mip"] = (mip, y, rows)
+    return _worker["lp"], _worker.get("mip")
+
+
+# The scenario MIP with the first stage as a free, bounded integer copy, for
+# the strengthened cut intercepts. It is the single-scenario model from
+# stochastic.py, so a new link matrix is swapped in by set_scenario.
+def _lagrangian_model(block):
+    if "lagrangian" not in _worker:
+        model = scenario_model(_worker["first"], [block], GRB.MINIMIZE, _worker["recourse_vtype"], env=_worker["env"])
+        model._x.UB = _worker["first_ub"]
+        model._x.VType = GRB.INTEGER
+        _worker["lagrangian"] = model
+    return _worker["lagrangian"]
+
+
+# Identical scenarios of a batch (as sampled from a discrete distribution)
+# with their probabilities summed; the recourse matrix is shared anyway
+def _distinct(probabilities, blocks):
+    distinct = {}
+    for p, block in zip(probabilities, blocks):
+        link = sp.csr_matrix(block.link)
+        key = (block.cost.tobytes(), block.rhs.tobytes(), link.data.tobytes(), link.indices.tobytes(),
+               link.indptr.tobytes())
+        if key in distinct:
+            distinct[key][0] += p
+        else:
+            distinct[key] = [p, block]
+    return distinct.values()
+
+
+# Solve the scenarios start..stop-1 at x_val, each distinct scenario once.
+# Returns the probability-weighted cut value at x_val and cut (intercept +
+# slope @ x), the weighted exact value and the feasibility cuts (0 >=
+# intercept + slope @ x) of any infeasible scenario. With integer recourse
+# the cut intercepts are strengthened only when strengthen is set.
+def _solve_batch(task):
+    start, stop, probabilities, x_val, strengthen = task
+    blocks = _worker["make_batch"](start, stop)
+    value = intercept = exact = 0.0
+    slope = np.zeros(len(x_val))
+    infeasible = []
+
+    for p, block in _distinct(probabilities, blocks):
+        (lp, y, rows), mip = _recourse_models(block)
+        rhs = block.rhs - block.link @ x_val
+        y.Obj = block.cost
+        rows.RHS = rhs
+        lp.optimize()
+
+        if lp.Status not in (GRB.OPTIMAL, GRB.INFEASIBLE):
+            raise RuntimeError("A recourse problem of scenarios %d-%d has status %d" % (start, stop - 1, lp.Status))
+        if lp.Status == GRB.INFEASIBLE:
+            farkas = rows.FarkasDual
+            infeasible.append((-(farkas @ block.rhs), block.link.T @ farkas))
+            continue
+
+        # The duals stay feasible for any x; variables at their upper bound
+        # add a constant (the objective not explained by the row duals)
+        pi = rows.Pi
+        gradient = -(block.link.T @ pi)
+        if mip is None:
+            value += p * lp.ObjVal
+            intercept += p * (pi @ block.rhs + lp.ObjVal - pi @ rhs)
+            slope += p * gradient
+            exact += p * lp.ObjVal
+            continue
+
+        model, y_int, rows_int = mip
+        y_int.Obj = block.cost
+        rows_int.RHS = rhs
+        model.optimize()
+        exact += p * model.ObjVal if model.Status == GRB.OPTIMAL else np.inf
+
+        # Strengthened intercept: min over the first stage and recourse of
+        # cost @ y - gradient @ x, never below the LP intercept
+        a = pi @ block.rhs + lp.ObjVal - pi @ rhs
+        if strengthen:
+            lagrangian = _lagrangian_model(block)
+            set_scenario(lagrangian, block)
+            lagrangian._x.Obj = -gradient
+            lagrangian.optimize()
+            if lagrangian.Status == GRB.OPTIMAL:
+                a = lagrangian.ObjVal
+        value += p * (a + gradient @ x_val)
+        intercept += p * a
+        slope += p * gradient
+
+    return value, intercept, slope, exact, infeasible
+
+
+# Solve a two-stage model by the L-shaped method.
+#
+# first:          the first stage (FirstStage from stochastic.py), minimized
+# make_batch:     make_batch(start, stop) returns the Blocks of those scenarios
+#                 (a module-level function or functools.partial so that it
+#                 can be sent to the worker processes)
+# probabilities:  the probability of every scenario
+# multicut:       one recourse estimate per batch (True) or one in total (False)
+# recourse_vtype: the recourse variable types; integer types need first_ub
+# first_ub:       upper bounds of the (then integer) first-stage decisions
+# theta_lb:       a lower bound on each scenario's recourse cost, if known.
+#                 By default (-inf) the recourse estimates start unbounded: as
+#                 in benders.solve the first iteration is solved with them
+#                 fixed at zero and its cuts at that first stage bound them
+#                 from then on. With integer recourse the Laporte-Louveaux
+#                 cuts then use the lowest value of the first aggregated
+#                 cut over the first-stage bounds.
+#
+# Returns the first-stage decisions, the best objective found and the lower
+# bound of the master problem.
+def solve(first, make_batch, probabilities, batch_size=1000, workers=1, threads=1, multicut=True,
+          recourse_vtype=GRB.CONTINUOUS, first_ub=None, theta_lb=-GRB.INFINITY, tol=1e-6, max_iterations=1000,
+          verbose=True):
+    start_time = time.perf_counter()
+    probabilities = np.asarray(probabilities, dtype=float)
+    batches = [(k, min(k + batch_size, len(probabilities))) for k in range(0, len(probabilities), batch_size)]
+    integer = np.any(np.asarray(recourse_vtype) != GRB.CONTINUOUS)
+    num_first = len(first.cost)
+
+    # The master problem
+    master = gb.Model("L-Shaped Master")
+    master.Params.OutputFlag = 0
+    if integer:
+        if first_ub is None:
+            raise ValueError("Integer recourse needs integer, bounded first-stage decisions (first_ub)")
+        ub = np.broadcast_to(np.asarray(first_ub, dtype=float), num_first)
+        x = master.addMVar(num_first, lb=0.0, ub=ub, vtype=GRB.INTEGER, name="x")
+
+        # Binary expansion of the first stage for the integer optimality cuts
+        bits = [max(1, math.ceil(math.log2(u + 1))) for u in ub]
+        digits = [master.addMVar(n, vtype=GRB.BINARY, name=f"bits_{i}") for i, n in enumerate(bits)]
+        for i, n in enumerate(bits):
+            master.addConstr(x[i] == (2.0 ** np.arange(n)) @ digits[i])
+        digit_vars = [v for d in digits for v in d.tolist()]
+    else:
+        x = master.addMVar(num_first, vtype=first.vtype, name="x")
+    if first.matrix is not None:
+        master.addMConstr(first.matrix, x, first.sense, first.rhs)
+
+    # Recourse estimates, bounded below by theta_lb times their probability
+    # mass; without a bound they are fixed at zero until the first cuts
+    groups = batches if multicut else [(0, len(probabilities))]
+    mass = np.array([probabilities[a:b].sum() for a, b in groups])
+    bounded = theta_lb > -GRB.INFINITY
+    theta = master.addMVar(len(groups), lb=theta_lb * mass if bounded else 0.0,
+                           ub=GRB.INFINITY if bounded else 0.0, name="theta")
+    master.setObjective(first.cost @ x + theta.sum(), GRB.MINIMIZE)
+    bound = theta_lb * probabilities.sum() if bounded else None
+
+    # The worker pool, or the same worker state in this process
+    pool = None
+    if workers > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(make_batch, first, first_ub, recourse_vtype, threads))
+    else:
+        _init_worker(make_batch, first, first_ub, recourse_vtype, threads)
+
+    # Strengthening costs an extra scenario MIP per scenario, so it stops for
+    # a batch (all batches with the aggregated cut) once its cut no longer
+    # separates; the Laporte-Louveaux cuts alone still converge
+    strengthen = np.full(len(batches), integer)
+
+    best_x, upper, lower = None, np.inf, -np.inf
+    try:
+        for iteration in range(max_iterations):
+            master.optimize()
+            if master.Status != GRB.OPTIMAL:
+                raise RuntimeError("The L-shaped master problem has status %d" % master.Status)
+            lower = master.ObjVal if bounded else -np.inf
+            x_val, theta_val = x.X, theta.X
+
+            tasks = [(a, b, probabilities[a:b], x_val, strengthen[k]) for k, (a, b) in enumerate(batches)]
+            results = list(pool.map(_solve_batch, tasks) if pool else map(_solve_batch, tasks))
+
+            # Feasibility cuts first; the exact value is only known once every scenario is feasible
+            infeasible = [cut for r in results for cut in r[4]]
+            for a, s in infeasible:
+                master.addConstr(a + s @ x <= 0)
+            if infeasible:
+                continue
+
+            exact = sum(r[3] for r in results)
+            objective = first.cost @ x_val + exact
+            if objective < upper:
+                best_x, upper = x_val, objective
+
+            if verbose:
+                print("Iteration %d: lower bound %.6f, upper bound %.6f" % (iteration, lower, upper))
+            if upper - lower <= tol * max(1.0, abs(upper)):
+                break
+
+            # Optimality cuts, per batch or aggregated; all of them at the
+            # first solution when they are what bounds the estimates
+            if multicut:
+                for k, (value, a, s, _, _) in enumerate(results):
+                    if not bounded or value > theta_val[k] + tol * max(1.0, abs(value)):
+                        master.addConstr(theta[k] >= a + s @ x)
+                    else:
+                        strengthen[k] = False
+            elif not bounded or sum(r[0] for r in results) > theta_val.sum() + tol * max(1.0, abs(lower)):
+                a = sum(r[1] for r in results)
+                s = sum(r[2] for r in results)
+                master.addConstr(theta.sum() >= a + s @ x)
+            else:
+                strengthen[:] = False
+
+            if not bounded:
+                theta.LB, theta.UB = -GRB.INFINITY, GRB.INFINITY
+                bounded = True
+                if integer:
+                    # The aggregated cut is a lower bound on the recourse for every x in [0, first_ub]
+                    a = sum(r[1] for r in results)
+                    s = sum(r[2] for r in results)
+                    bound = a + np.minimum(s, 0.0) @ ub
+
+            # Integer optimality cut at this first-stage solution: it is exact
+            # here and no stronger than the lower bound anywhere else
+            if integer and exact > theta_val.sum() + tol * max(1.0, abs(exact)):
+                ones = [v for v in digit_vars if v.X > 0.5]
+                zeros = [v for v in digit_vars if v.X <= 0.5]
+                master.addConstr(theta.sum() >= (exact - bound) * (gb.quicksum(ones) - gb.quicksum(zeros) - len(ones) + 1) + bound)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    if verbose:
+        print("L-shaped runtime (s): ", time.perf_counter() - start_time)
+    return best_x, upper, lower
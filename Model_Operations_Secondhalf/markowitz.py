@@ -0,0 +1,117 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gb
+from gurobipy import GRB
+
+from covariance import FactorModel
+
+
+# Build the minimum-variance portfolio model straight from the NumPy
+# covariance matrix: the risk is the matrix quadratic form x @ sigma @ x and
+# the budget is one matrix row, so no Python expression is created per pair
+# of assets. sigma can also be a FactorModel (covariance.py), which keeps the
+# model size at O(n k). With a target return the model also gets the row
+# mu @ x >= target.
+def build_model(mu, sigma, target=None, name="Portfolio Optimization", env=None):
+    start = time.perf_counter()
+
+    model = gb.Model(name, env=env)
+
+    # Fraction of the portfolio invested in each asset
+    x = model.addMVar(len(mu), lb=0, vtype=GRB.CONTINUOUS, name="Fraction")
+
+    constrs = {}
+
+    # Objective is to minimize risk, modeled using the covariance matrix or,
+    # for a factor model, through the k factor exposures y = B^T x:
+    # x^T (B F B^T + D) x = y^T F y + sum_i D_i x_i^2
+    if isinstance(sigma, FactorModel):
+        B, F, D = sigma
+        y = model.addMVar(B.shape[1], lb=-GRB.INFINITY, name="Exposure")
+        constrs["exposure"] = model.addConstr(y - B.T @ x == 0, name="exposure")
+        model.setObjective(y @ F @ y + x @ sp.diags(D) @ x, GRB.MINIMIZE)
+    else:
+        model.setObjective(x @ np.asarray(sigma, dtype=float) @ x, GRB.MINIMIZE)
+
+    # The budget constraint ensures we invest our entire portfolio
+    constrs["budget"] = model.addConstr(x.sum() == 1, name="budget")
+
+    # The expected return of the portfolio
+    if target is not None:
+        constrs["target"] = model.addConstr(np.asarray(mu, dtype=float) @ x >= target, name="target")
+
+    model.update()
+
+    # Keep the build time on the model so callers can report it
+    model._build_time = time.perf_counter() - start
+
+    return model, x, constrs
+
+
+# The frontier model of a worker process (or of the main process without a pool)
+_worker = {}
+
+
+def _init_worker(mu, sigma, threads, warm_start):
+    env = gb.Env(empty=True)
+    env.setParam("OutputFlag", 0)
+    env.setParam("Threads", threads)
+    env.start()
+    model, x, constrs = build_model(mu, sigma, target=float(np.min(mu)), env=env)
+
+    # Simplex re-uses the previous point's basis after a right-hand side
+    # change; barrier would start from scratch at every point
+    if warm_start:
+        model.Params.Method = 1
+    _worker.update(env=env, model=model, x=x, target=constrs["target"], warm_start=warm_start)
+
+
+# Sweep the target returns of one chunk in order with the worker's model
+def _solve_chunk(targets):
+    model, x, target = _worker["model"], _worker["x"], _worker["target"]
+    risks = np.full(len(targets), np.nan)
+    weights = np.full((len(targets), x.shape[0]), np.nan)
+    for k, r in enumerate(targets):
+        target.RHS = r
+        if not _worker["warm_start"]:
+            model.reset()
+        model.optimize()
+        if model.Status == GRB.OPTIMAL:
+            risks[k] = model.ObjVal
+            weights[k] = x.X
+    return risks, weights
+
+
+# The efficient frontier: the minimum variance portfolio for every target
+# return in targets. Consecutive targets are solved warm-started from the
+# previous point's simplex basis; with more than one worker the sorted
+# targets are split into contiguous chunks, one model per worker process.
+# The results go straight into preallocated arrays.
+#
+# Returns the volatility (standard deviation) and the weights of every point,
+# in the order of targets (NaN where the target cannot be reached).
+def frontier(mu, sigma, targets, workers=1, threads=1, warm_start=True):
+    targets = np.asarray(targets, dtype=float)
+    order = np.argsort(targets)
+    volatility = np.full(len(targets), np.nan)
+    weights = np.full((len(targets), len(mu)), np.nan)
+
+    chunks = np.array_split(order, max(1, workers))
+    if workers > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(mu, sigma, threads, warm_start)) as pool:
+            results = list(pool.map(_solve_chunk, [targets[chunk] for chunk in chunks]))
+    else:
+        _init_worker(mu, sigma, threads, warm_start)
+        results = [_solve_chunk(targets[chunk]) for chunk in chunks]
+
+    for chunk, (risks, chunk_weights) in zip(chunks, results):
+        volatility[chunk] = np.sqrt(risks)
+        weights[chunk] = chunk_weights
+    return volatility, weights
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+# Closed-form solver for single-product newsvendor problems
+#
+#     min  order_cost * x + sum_n p_n * R_n(D_n - x),   x >= 0
+#
+# where R_n is the recourse cost of scenario n as a function of the shortfall
+# s = D_n - x (negative when there is stock left over). Each R_n is piecewise
+# linear on the segments [breakpoints[m], breakpoints[m+1]) with
+# R_n(s) = intercept[n, m] + slope[n, m] * s. The first and last breakpoints
+# are -inf and inf; intercept and slope can also be shared by all scenarios
+# (shape (k,)). For the classical newsvendor the optimum is the
+# critical-fractile quantile of demand; in general the objective is piecewise
+# linear in x, so the optimum sits at a kink x = D_n - breakpoints[m]. All
+# kinks are evaluated at once from prefix sums over the sorted demands, which
+# takes O(n log n) for a fixed number of segments.
+def solve(demand, probabilities, order_cost, breakpoints, intercept, slope, max_order=np.inf):
+    demand = np.asarray(demand, dtype=float)
+    probabilities = np.asarray(probabilities, dtype=float)
+    breakpoints = np.asarray(breakpoints, dtype=float)
+    num_segments = len(breakpoints) - 1
+    intercept = np.broadcast_to(np.asarray(intercept, dtype=float), (len(demand), num_segments))
+    slope = np.broadcast_to(np.asarray(slope, dtype=float), (len(demand), num_segments))
+
+    # Sort the scenarios by demand once
+    order = np.argsort(demand, kind="stable")
+    demand = demand[order]
+    p = probabilities[order, None]
+    intercept = intercept[order]
+    slope = slope[order]
+
+    # In segment m a scenario contributes p*(intercept + slope*D) - p*slope*x;
+    # prefix sums of both parts give the total over any run of sorted demands
+    constant = np.vstack([np.zeros(num_segments), np.cumsum(p * (intercept + slope * demand[:, None]), axis=0)])
+    linear = np.vstack([np.zeros(num_segments), np.cumsum(p * slope, axis=0)])
+
+    # Candidate order quantities: every kink plus the bounds
+    finite = breakpoints[np.isfinite(breakpoints)]
+    candidates = np.unique(np.concatenate([(np.unique(demand)[:, None] - finite[None, :]).ravel(), [0.0]]))
+    candidates = candidates[(candidates >= 0) & (candidates <= max_order)]
+    if np.isfinite(max_order):
+        candidates = np.append(candidates, max_order)
+
+    objectives = expected_cost(candidates, demand, constant, linear, breakpoints, order_cost)
+    best = np.argmin(objectives)
+    return float(candidates[best]), float(objectives[best])
+
+
+# The expected cost at each order quantity in x, from the prefix sums
+def expected_cost(x, demand, constant, linear, breakpoints, order_cost):
+    x = np.asarray(x, dtype=float)
+
+    # Scenario n is in segment m when x + breakpoints[m] <= D_n < x + breakpoints[m+1]
+    bounds = np.searchsorted(demand, x[:, None] + breakpoints[None, :], side="left")
+    lo, hi = bounds[:, :-1], bounds[:, 1:]
+    segments = np.arange(len(breakpoints) - 1)
+    total = (constant[hi, segments] - constant[lo, segments]) - x[:, None] * (linear[hi, segments] - linear[lo, segments])
+    return order_cost * x + total.sum(axis=1)
+
+
+# Slopes and intercepts of a recourse cost function R(s) that is linear
+# between consecutive breakpoints. R is evaluated at two interior points of
+# each segment, so it may jump at the breakpoints.
+def linearize(recourse, breakpoints):
+    breakpoints = np.asarray(breakpoints, dtype=float)
+    lo, hi = breakpoints[:-1].copy(), breakpoints[1:].copy()
+    lo[~np.isfinite(lo)] = hi[~np.isfinite(lo)] - 3.0
+    hi[~np.isfinite(hi)] = lo[~np.isfinite(hi)] + 3.0
+    s1, s2 = lo + (hi - lo) / 3, lo + 2 * (hi - lo) / 3
+    r1, r2 = recourse(s1), recourse(s2)
+    slope = (r2 - r1) / (s2 - s1)
+    return r1 - slope * s1, slope
+
+
+# Compare the closed-form answer with a solver answer
+def cross_check(x_fast, objective_fast, x_solver, objective_solver, tol=1e-6):
+    scale = max(1.0, abs(objective_solver))
+    agree = abs(objective_fast - objective_solver) <= tol * scale
+    print("Closed form: order %.4f, objective %.4f" % (x_fast, objective_fast))
+    print("Solver:      order %.4f, objective %.4f" % (x_solver, objective_solver))
+    print("The objectives agree." if agree else "The objectives DO NOT agree.")
+    return agree
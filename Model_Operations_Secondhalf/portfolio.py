@@ -2,30 +2,55 @@ import matplotlib.pyplot as plt
 from gurobipy import GRB
 import gurobipy as gb
 import pandas as pd
-import yfinance as yf
 import numpy as np
 from math import sqrt
+from markowitz import build_model, frontier as efficient_frontier
+import pricestore
+import covariance
+import backtest
 
 # Compute minimum risk portfolio or efficient frontier?
 FRONTIER = True
 
+# Build the model from the covariance matrix (True) or term by term (False)?
+VECTORIZED = True
+
+# The local price store, and whether to replay it without contacting Yahoo Finance
+PRICE_STORE = "/Users/mahinbindra/Downloads/sp500_closes.parquet"
+OFFLINE = False
+
+# The covariance estimate: "sample", "ledoit-wolf" or "factor" (a k-factor
+# model, which needs the VECTORIZED build)
+COVARIANCE = "sample"
+FACTORS = 10
+
+# Backtest monthly rebalances (every 21 trading days) of the minimum risk
+# portfolio over two-year windows of the whole stored price history?
+BACKTEST = False
+BACKTEST_WINDOW = 504
+BACKTEST_STEP = 21
+
+# The number of efficient frontier points and the worker processes that solve them
+FRONTIER_POINTS = 25
+WORKERS = 1
+
 # Read the ticker symbols of the S&P 500 from the file
 symbols = pd.read_csv("/Users/mahinbindra/Downloads/symbols.csv")
 stocks = symbols["Symbol"].values.tolist()
 
-# Download two years worth of data for each stock from Yahoo Finance
-data = yf.download(stocks, period='2y')
-
-# Matrix of daily closing prices for each stock in the S&P 500
-closes = np.transpose(np.array(data.Close)) 
-
-# The absolute change in daily closing prices for each stock on the S&P 500
-absdiff = np.diff(closes)                   
+# Two years worth of daily closes for each stock: from the local store, after
+# fetching only the dates (and stocks) it is missing from Yahoo Finance
+start = pd.Timestamp.today().normalize() - pd.DateOffset(years=2)
+if OFFLINE:
+    prices = pricestore.load(PRICE_STORE, stocks, start=start)
+else:
+    prices = pricestore.refresh(PRICE_STORE, stocks, start)
 
 # Compute the daily return for each stock on the S&P 500 by dividing the 
 # absolute difference in closes prices by the starting share price. Note
 # that this normalizes the return so it doesn't depend on share prices.
-reldiff = np.divide(absdiff, closes[:,:-1]) 
+# One row per stock, as a view of the returns buffer.
+reldiff = pricestore.returns(prices)
 
 # The mean return for each stoch on the S&P 500
 mu = np.mean(reldiff, axis=1)
@@ -33,39 +58,52 @@ mu = np.mean(reldiff, axis=1)
 # The standard deviation of returns (diagonal of the covariance matrix)
 std = np.std(reldiff, axis=1)               
 
-# The convariance matrix associated with the returns 
-sigma = np.cov(reldiff)                     
-
 # Find the nan values for mu and std
 nan_indices_mu = np.isnan(mu)
 nan_indices_std = np.isnan(std)
 nan_indices_combined = np.logical_or(nan_indices_mu, nan_indices_std) 
 
-# Remove the nan values for mu, std, and sigma
+# Remove the nan values for mu and std
 mu = mu[~nan_indices_combined]
 std = std[~nan_indices_combined]
-sigma = sigma[~nan_indices_combined][:, ~nan_indices_combined]
 
-# Create an empty optimization model
-model = gb.Model('Portfolio Optimization')
+# The convariance matrix associated with the returns of the non-nan stocks:
+# the sample covariance, its Ledoit-Wolf shrinkage or a factor model
+if COVARIANCE == "ledoit-wolf":
+    sigma, shrinkage = covariance.ledoit_wolf(reldiff[~nan_indices_combined])
+    print("Ledoit-Wolf shrinkage intensity: ", shrinkage)
+elif COVARIANCE == "factor":
+    sigma = covariance.pca_factors(reldiff[~nan_indices_combined], FACTORS)
+else:
+    sigma = np.cov(reldiff[~nan_indices_combined])
 
-# Add decision variables for the non-nan stocks
 stock_index = range(len(mu))
-x = model.addVars(stock_index, lb=0, vtype=gb.GRB.CONTINUOUS, name="Fraction")
 
-# Objective is to minimize risk.  This is modeled using the
-# covariance matrix, which measures the historical correlation between stocks
-portfolio_risk = gb.quicksum(x[i]*x[j]*sigma[i,j] for i in stock_index for j in stock_index)
-model.setObjective(portfolio_risk, GRB.MINIMIZE)
+if VECTORIZED:
+    # The risk x @ sigma @ x and the budget row straight from the NumPy arrays
+    model, x, constrs = build_model(mu, sigma)
+    print("Model build time (s): ", model._build_time)
+
+else:
+    # Create an empty optimization model
+    model = gb.Model('Portfolio Optimization')
 
-# The proportion constraints ensure we invest our entire portfolio
-model.addConstr(gb.quicksum(x[i] for i in stock_index) == 1)
+    # Add decision variables for the non-nan stocks
+    x = model.addVars(stock_index, lb=0, vtype=gb.GRB.CONTINUOUS, name="Fraction")
+
+    # Objective is to minimize risk.  This is modeled using the
+    # covariance matrix, which measures the historical correlation between stocks
+    portfolio_risk = gb.quicksum(x[i]*x[j]*sigma[i,j] for i in stock_index for j in stock_index)
+    model.setObjective(portfolio_risk, GRB.MINIMIZE)
+
+    # The proportion constraints ensure we invest our entire portfolio
+    model.addConstr(gb.quicksum(x[i] for i in stock_index) == 1)
 
 # Optimize model to find the minimum risk portfolio
 model.optimize()
 
 # Create an array of proportions which represent the optimal solution
-x_flat = np.array([x[i].x for i in stock_index])
+x_flat = x.X if VECTORIZED else np.array([x[i].x for i in stock_index])
 
 # Comptue the minimum risk of the portfolio as well as the expected return (daily)
 minrisk_volatility = sqrt(model.objval)
@@ -73,7 +111,7 @@ minrisk_return = mu @ x_flat
 
 # Convert the average daily values into a yearly value (251 working days).
 # Then, convert these yearly values into a percentage.
-number_of_days = len(closes[0])/2
+number_of_days = len(prices)/2
 minrisk_return_out = minrisk_return*number_of_days*100
 minrisk_volatility_out = minrisk_volatility*sqrt(number_of_days)*100
 
@@ -90,15 +128,11 @@ print("Expected Yearly Volatility (%): ", minrisk_volatility_out)
 # Did you want to compute the efficient frontier?
 if FRONTIER:
 
-    # Create an expression representing the expected return for the portfolio; add this as a constraint
-    target = model.addConstr(gb.quicksum(mu[i]*x[i] for i in stock_index) >= minrisk_return, 'target')
-    
-    # Solve for efficient frontier by varying the mean return
-    frontier = np.empty((2,0))
-    for r in np.linspace(mu.min(), mu.max(), 25):
-        target.rhs = r
-        model.optimize()
-        frontier = np.append(frontier, [[sqrt(model.objval)],[r]], axis=1)
+    # Solve for efficient frontier by varying the mean return; every point is
+    # warm-started from the previous one (see markowitz.py)
+    targets = np.linspace(mu.min(), mu.max(), FRONTIER_POINTS)
+    volatility, _ = efficient_frontier(mu, sigma, targets, workers=WORKERS)
+    frontier = np.vstack([volatility, targets])
     
     # Plot the efficient frontier
     fig, ax = plt.subplots(figsize=(10,8))
@@ -121,4 +155,20 @@ if FRONTIER:
     ax.set_ylabel('Expected Return')
     ax.legend()
     ax.grid()
-    plt.show()
\ No newline at end of file
+    plt.show()
+
+# Did you want to backtest the minimum risk portfolio?
+if BACKTEST:
+
+    # The stocks with a complete price history in the store
+    history = pricestore.load(PRICE_STORE, stocks)
+    history = history.loc[:, history.notna().all()]
+
+    # One row of returns per day, one model for all windows (see backtest.py)
+    results, weights = backtest.backtest(pricestore.returns(history).T, BACKTEST_WINDOW, BACKTEST_STEP,
+                                         dates=history.index[1:])
+    print(results)
+    print("Backtest Yearly Return (%): ", ((1 + results["return"]).prod() ** (251 / (BACKTEST_STEP * len(results))) - 1) * 100)
+    print("Average Turnover per Rebalance: ", results["turnover"].iloc[1:].mean())
+    print("Model Build Time (s): ", results["build_seconds"].iloc[0])
+    print("Average Solve Time per Window (s): ", results["solve_seconds"].mean())
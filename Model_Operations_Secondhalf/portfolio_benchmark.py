@@ -0,0 +1,97 @@
+import csv
+import multiprocessing
+import resource
+import sys
+import time
+
+import numpy as np
+import gurobipy as gb
+from gurobipy import GRB
+
+from markowitz import build_model
+
+# The universe sizes (number of assets) to compare, and the largest size at
+# which the term-by-term build is still run (it grows with the square of the
+# number of assets) and at which the model is also solved
+SIZES = [500, 2000, 5000]
+LOOP_MAX = 2000
+SOLVE_MAX = 2000
+FACTORS = 10
+SEED = 0
+OUTPUT = 'portfolio_benchmark.csv'
+
+FIELDS = ['assets', 'build', 'build_seconds', 'build_rss_mb', 'peak_rss_mb', 'solve_seconds', 'objective']
+
+
+# The peak RSS of this process in MB (ru_maxrss is in bytes on macOS and in
+# kilobytes on Linux)
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+# Synthetic daily returns statistics: a factor covariance matrix plus
+# idiosyncratic variance, which is positive definite at any size
+def instance(num_assets, seed=SEED):
+    rng = np.random.default_rng(seed)
+    loadings = rng.normal(0, 0.01, (num_assets, FACTORS))
+    sigma = loadings @ loadings.T + np.diag(rng.uniform(1e-4, 4e-4, num_assets))
+    mu = rng.normal(5e-4, 5e-4, num_assets)
+    return mu, sigma
+
+
+# The term-by-term build of portfolio.py
+def build_model_loop(mu, sigma):
+    start = time.perf_counter()
+    model = gb.Model('Portfolio Optimization')
+    stock_index = range(len(mu))
+    x = model.addVars(stock_index, lb=0, vtype=gb.GRB.CONTINUOUS, name="Fraction")
+    portfolio_risk = gb.quicksum(x[i]*x[j]*sigma[i,j] for i in stock_index for j in stock_index)
+    model.setObjective(portfolio_risk, GRB.MINIMIZE)
+    model.addConstr(gb.quicksum(x[i] for i in stock_index) == 1)
+    model.update()
+    model._build_time = time.perf_counter() - start
+    return model
+
+
+# Build (and for small enough universes solve) one model. Each run happens in
+# its own worker process so that the peak RSS belongs to that build alone.
+def run(args):
+    num_assets, build = args
+    mu, sigma = instance(num_assets)
+    before = peak_rss_mb()
+
+    if build == 'matrix':
+        model = build_model(mu, sigma)[0]
+    else:
+        model = build_model_loop(mu, sigma)
+    peak = peak_rss_mb()
+
+    solve_seconds = objective = None
+    if num_assets <= SOLVE_MAX:
+        model.Params.OutputFlag = 0
+        start = time.perf_counter()
+        model.optimize()
+        solve_seconds = time.perf_counter() - start
+        objective = model.ObjVal
+
+    return {'assets': num_assets,
+            'build': build,
+            'build_seconds': model._build_time,
+            'build_rss_mb': peak - before,
+            'peak_rss_mb': peak,
+            'solve_seconds': solve_seconds,
+            'objective': objective}
+
+
+if __name__ == '__main__':
+    grid = [(n, build) for n in SIZES for build in ('matrix', 'loop') if build == 'matrix' or n <= LOOP_MAX]
+
+    # One fresh process per build, run one after another so timings do not interfere
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool, open(OUTPUT, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in pool.imap(run, grid):
+            writer.writerow(row)
+            f.flush()
+            print(f"{row['assets']} assets ({row['build']}): build {row['build_seconds']:.3f}s, "
+                  f"build memory {row['build_rss_mb']:.1f} MB, objective {row['objective']}")
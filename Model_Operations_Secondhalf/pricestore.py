@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# A local store of daily closing prices: one Parquet file with a Date column
+# and one float64 column per ticker, sorted by date. Columns are read one
+# ticker at a time from disk, so loading a subset of the universe never reads
+# the rest, and refresh() only asks the source for what the file is missing.
+
+
+# Daily closes from Yahoo Finance as a (date x ticker) frame, empty (with one
+# column per ticker) when there is nothing from start on. yfinance is only
+# needed when the store is refreshed, never for offline replay.
+def yahoo(tickers, start):
+    import yfinance as yf
+    data = yf.download(tickers, start=start, progress=False, auto_adjust=False)
+    if data.empty or "Close" not in data:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"), columns=list(tickers), dtype=float)
+    closes = data["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    return closes
+
+
+# The cached closes of tickers (all of them by default) from start on, with
+# one column per ticker in the order given (NaN for tickers not in the store).
+# This is the offline replay: no source is contacted.
+def load(path, tickers=None, start=None):
+    if not os.path.exists(path):
+        raise FileNotFoundError("No price store at %s; run refresh() with a source first" % path)
+    stored = pq.read_schema(path).names
+    columns = None if tickers is None else [t for t in tickers if t in stored]
+    table = pq.read_table(path, columns=None if columns is None else ["Date"] + columns,
+                          filters=None if start is None else [("Date", ">=", pd.Timestamp(start))])
+    prices = table.to_pandas().set_index("Date")
+    return prices if tickers is None else prices.reindex(columns=list(tickers))
+
+
+# Bring the store up to date for tickers: tickers already stored are fetched
+# only for the dates after the last stored date (and not at all when no
+# business day has passed since), new tickers for their full history from
+# start. The file is rewritten atomically when anything was fetched, and the
+# closes of tickers from start on are returned.
+def refresh(path, tickers, start, source=yahoo):
+    start = pd.Timestamp(start)
+    if os.path.exists(path):
+        prices = load(path)
+    else:
+        prices = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"), dtype=float)
+
+    # Only the missing dates of known tickers, the whole window for new ones
+    known = [t for t in tickers if t in prices.columns]
+    new = [t for t in tickers if t not in prices.columns]
+    fetched = []
+    if known and len(prices.index):
+        missing_from = prices.index.max() + pd.Timedelta(days=1)
+        if len(pd.bdate_range(missing_from, pd.Timestamp.today().normalize())):
+            fetched.append(source(known, missing_from))
+    if new or not len(prices.index):
+        fetched.append(source(new or list(tickers), start))
+
+    for frame in fetched:
+        frame = frame.astype(float)
+        frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+        prices = prices.combine_first(frame)
+
+    if fetched:
+        prices = prices.sort_index()
+        prices.index.name = "Date"
+        _write(path, prices)
+    return prices.loc[prices.index >= start].reindex(columns=list(tickers))
+
+
+def _write(path, prices):
+    table = pa.Table.from_pandas(prices.reset_index(), preserve_index=False)
+    temporary = path + ".tmp"
+    pq.write_table(table, temporary)
+    os.replace(temporary, path)
+
+
+# Daily relative returns (close to close) of a (date x ticker) price frame as
+# a (ticker x date) matrix. The returns are computed in place in one new
+# date-major buffer (to_numpy may also copy the prices) and handed out as its
+# transpose, a non-contiguous view, rather than as a second, transposed copy.
+def returns(prices):
+    closes = prices.to_numpy(dtype=float)
+    out = np.empty((closes.shape[0] - 1, closes.shape[1]))
+    np.subtract(closes[1:], closes[:-1], out=out)
+    np.divide(out, closes[:-1], out=out)
+    return out.T
@@ -1,55 +1,133 @@
 import random
 import math
 
+import numpy as np
+
+import streaming
+import variancereduction
+
 TRIALS = 10000
-totalTime = 0
-totalTimeSquared = 0
+
+# Or, in the vectorized mode, simulate chunks of packages until the 95%
+# confidence interval half-width (minutes) is this small?
+TARGET_HALF_WIDTH = None
+
+# Running mean and variance of the service times
+stats = streaming.EMPTY
 
 # Should we calculate and report the SE?
 CALCULATE_SE = False
 
-for trial in range(TRIALS):
+# Simulate the packages in NumPy chunks (True) or one at a time (False)?
+VECTORIZED = True
+
+# Compare with stratified sampling over the package types and suspicion?
+VARIANCE_REDUCTION = False
+CHUNK_SIZE = 1000000
+SEED = None
+
+# Package types FOOD, WEAPON and OTHER: the cumulative type probabilities,
+# the lognormal service time parameters, the chance that a package is
+# suspicious and the gamma disposal time parameters
+TYPE_CUTOFFS = np.array([0.3, 0.4])
+SERVICE_MU = np.array([1.4, 1.9, 1.1])
+SERVICE_SIGMA = np.array([0.5, 0.4, 0.1])
+SUSPICIOUS = np.array([0.2, 0.4, 0.06])
+DISPOSAL_SHAPE = np.array([18.0, 26.0, 22.0])
+DISPOSAL_SCALE = np.array([3.0, 6.0, 7.0])
+
+
+# The service times of packages of known types and suspicion, drawn as
+# arrays: the same model as the loop below with the branches replaced by
+# per-type parameter lookups
+def service_times(rng, packageType, suspicious):
+    serviceTime = rng.lognormal(SERVICE_MU[packageType], SERVICE_SIGMA[packageType])
+
+    # Only the suspicious packages draw a disposal time
+    disposed = packageType[suspicious]
+    serviceTime[suspicious] += rng.gamma(DISPOSAL_SHAPE[disposed], DISPOSAL_SCALE[disposed])
+    return serviceTime
+
+
+# The service times of size random packages
+def simulate(rng, size):
+    packageType = np.searchsorted(TYPE_CUTOFFS, rng.random(size), side="right")
+    suspicious = rng.random(size) < SUSPICIOUS[packageType]
+    return service_times(rng, packageType, suspicious)
+
+
+if VECTORIZED:
+    if TARGET_HALF_WIDTH is None:
+        stats = streaming.sequential(simulate, 0.0, batch_size=CHUNK_SIZE, max_trials=TRIALS, seed=SEED)
+    else:
+        stats = streaming.sequential(simulate, TARGET_HALF_WIDTH, batch_size=CHUNK_SIZE, seed=SEED)
+
+# The original simulation, one package at a time
+else:
+    for trial in range(TRIALS):
     
-    # Determine the type of package and sets the first service time
-    packageProb = random.random()                           # Generates a random number between 0 and 1
+        # Determine the type of package and sets the first service time
+        packageProb = random.random()                           # Generates a random number between 0 and 1
     
-    # If the x-ray scan reveals that the package is a food item. 
-    if packageProb < 0.3:                   
-        packageType = "FOOD"
-        serviceTime = random.lognormvariate(1.4, 0.5)       # Generates a lognormal random variate
-    # If the x-ray scan reveals that the package is a weapon.
-    elif packageProb < 0.4:
-        packageType = "WEAPON"
-        serviceTime = random.lognormvariate(1.9, 0.4)       # Generates a lognormal random variate
-    # If the x-ray scan reveals that the package is another item.
-    else:
-        packageType = "OTHER"
-        serviceTime = random.lognormvariate(1.1, 0.1)       # Generates a lognormal random variate
+        # If the x-ray scan reveals that the package is a food item. 
+        if packageProb < 0.3:                   
+            packageType = "FOOD"
+            serviceTime = random.lognormvariate(1.4, 0.5)       # Generates a lognormal random variate
+        # If the x-ray scan reveals that the package is a weapon.
+        elif packageProb < 0.4:
+            packageType = "WEAPON"
+            serviceTime = random.lognormvariate(1.9, 0.4)       # Generates a lognormal random variate
+        # If the x-ray scan reveals that the package is another item.
+        else:
+            packageType = "OTHER"
+            serviceTime = random.lognormvariate(1.1, 0.1)       # Generates a lognormal random variate
         
-    # Given the package type is known, augment the service time if it is suspicious as it must be disposed of.    
-    if packageType == "FOOD":
-        if(random.random() < 0.2):                          # If suspicious, increase service time for food
-            serviceTime += random.gammavariate(18,3)        
-    elif packageType == "WEAPON":                           # If suspicious, increase service time for weapons
-        if(random.random() < 0.4):
-            serviceTime += random.gammavariate(26,6)
-    elif packageType == "OTHER":                            # If suspicious, increase service time for other
-        if(random.random() < 0.06):
-            serviceTime += random.gammavariate(22,7)                               
-    totalTime += serviceTime                                # Add the service time to the summation
-    totalTimeSquared += serviceTime*serviceTime             # Add the squared service time to the summation
+        # Given the package type is known, augment the service time if it is suspicious as it must be disposed of.    
+        if packageType == "FOOD":
+            if(random.random() < 0.2):                          # If suspicious, increase service time for food
+                serviceTime += random.gammavariate(18,3)        
+        elif packageType == "WEAPON":                           # If suspicious, increase service time for weapons
+            if(random.random() < 0.4):
+                serviceTime += random.gammavariate(26,6)
+        elif packageType == "OTHER":                            # If suspicious, increase service time for other
+            if(random.random() < 0.06):
+                serviceTime += random.gammavariate(22,7)                               
+        stats = streaming.update(stats, serviceTime)            # Add the service time to the running statistics
     
+
 # Calculate the average time over all trials and print the result 
-averageTime = 1.0*totalTime/TRIALS
-print("The average service time is %2.2f minutes." % averageTime)    
+averageTime = stats.mean
+print("The average service time is %2.2f minutes over %d packages." % (averageTime, stats.count))
 
 if CALCULATE_SE:
     # Calculate the standard error over all trials and print the result 
-    variance = 1.0/(TRIALS-1)*totalTimeSquared - 1.0*TRIALS/(TRIALS-1)*averageTime*averageTime
-    standardDeviation = math.sqrt(variance)              
-    standardError = math.sqrt(1.0*variance/TRIALS)
+    standardDeviation = math.sqrt(streaming.variance(stats))
+    standardError = streaming.standard_error(stats)
     print("The standard deviation is %2.2f minutes." % standardDeviation)
     print("The standard error is %2.2f minutes." % standardError)
     print("The 90%% confidence interval is (%2.2f, %2.2f)." % (averageTime -  1.645*standardError , averageTime + 1.645*standardError))
     print("The 95%% confidence interval is (%2.2f, %2.2f)." % (averageTime -  1.96*standardError , averageTime + 1.96*standardError))
-    print("The 99%% confidence interval is (%2.2f, %2.2f)." % (averageTime -  2.575*standardError , averageTime + 2.575*standardError))
\ No newline at end of file
+    print("The 99%% confidence interval is (%2.2f, %2.2f)." % (averageTime -  2.575*standardError , averageTime + 2.575*standardError))
+
+# The package type and suspicion have known probabilities, so they can be
+# fixed per stratum instead of drawn: the same number of packages is split
+# over the six strata and only the service and disposal times stay random
+if VECTORIZED and VARIANCE_REDUCTION:
+    typeProbabilities = np.diff(np.concatenate([[0.0], TYPE_CUTOFFS, [1.0]]))
+    strata = [(packageType, suspicious) for packageType in range(len(typeProbabilities)) for suspicious in (True, False)]
+    weights = [typeProbabilities[k] * (SUSPICIOUS[k] if suspicious else 1 - SUSPICIOUS[k]) for k, suspicious in strata]
+
+    rng = np.random.default_rng(SEED)
+    strataStats = []
+    for (packageType, suspicious), count in zip(strata, variancereduction.allocate(weights, stats.count)):
+        stratumStats = streaming.EMPTY
+        for start in range(0, count, CHUNK_SIZE):
+            size = min(CHUNK_SIZE, count - start)
+            stratumStats = streaming.update(stratumStats, service_times(rng, np.full(size, packageType), np.full(size, suspicious)))
+        strataStats.append(stratumStats)
+
+    crudeEstimate = variancereduction.crude(stats)
+    stratifiedEstimate = variancereduction.stratified(strataStats, weights)
+    print("Stratified: the average service time is %2.2f minutes, standard error %2.4f." % (stratifiedEstimate.mean, stratifiedEstimate.standard_error))
+    print("Crude:      the average service time is %2.2f minutes, standard error %2.4f." % (crudeEstimate.mean, crudeEstimate.standard_error))
+    print("The variance-reduction factor is %2.2f." % variancereduction.reduction_factor(crudeEstimate, stratifiedEstimate))
@@ -0,0 +1,184 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.stats as st
+import gurobipy as gb
+from gurobipy import GRB
+
+
+# The sample average approximation (SAA) of the vaccine procurement problem
+# for a sample of a fixed size. The model is built once; each trial swaps in
+# its sampled demands and costs with set_sample, which only overwrites the
+# demand right-hand sides and the objective coefficients, so memory and the
+# time per trial do not grow with the number of trials.
+#
+#     max  1/N sum_n (r - c_n) x - (r - c_n) d_minus_n - (r - c_n + v) d_plus_n
+#     s.t. x + d_minus_n - d_plus_n == D_n
+def saa_model(samples, r, v, env=None):
+    model = gb.Model("Vaccine Procurement SAA", env=env)
+    model.Params.OutputFlag = 0
+
+    # Solve every sample to optimality, so that warm starts from earlier
+    # trials cannot change the results
+    model.Params.MIPGap = 0
+
+    # Capacity and the deviations from the demand of every sample
+    x = model.addMVar(1, lb=0, vtype=GRB.INTEGER, name="Capacity")
+    d_plus = model.addMVar(samples, lb=0, vtype=GRB.INTEGER, name="Above")
+    d_minus = model.addMVar(samples, lb=0, vtype=GRB.INTEGER, name="Below")
+    model.ModelSense = GRB.MAXIMIZE
+
+    # Demand constraint; the right-hand sides are set per trial
+    demand = model.addConstr(x + d_minus - d_plus == np.zeros(samples), name="Demand")
+    model.update()
+
+    model._x, model._d_plus, model._d_minus, model._demand = x, d_plus, d_minus, demand
+    model._r, model._v = r, v
+    return model
+
+
+# Swap one trial's sampled demands and costs into an SAA model. A previous
+# capacity is kept as the MIP start, with the deviations that make it feasible
+# for the new demands.
+def set_sample(model, doses, cost):
+    doses = np.asarray(doses, dtype=float)
+    margin = (model._r - np.asarray(cost, dtype=float)) / len(doses)
+
+    model._x.Obj = margin.sum()
+    model._d_minus.Obj = -margin
+    model._d_plus.Obj = -(margin + model._v / len(doses))
+    model._demand.RHS = doses
+
+    if model.SolCount > 0:
+        capacity = model._x.X
+        model._x.Start = capacity
+        model._d_plus.Start = np.maximum(capacity - doses, 0)
+        model._d_minus.Start = np.maximum(doses - capacity, 0)
+
+
+# Solve an SAA model for one sample and return the objective and capacity
+def solve_sample(model, doses, cost):
+    set_sample(model, doses, cost)
+    model.optimize()
+    return model.ObjVal, model._x.X[0]
+
+
+# The vaccine procurement problem for the trial runner: draw a sample of the
+# sales history rows, solve its SAA model and evaluate a fixed capacity on a
+# sample (the profit with that capacity, without solving anything)
+def vaccine_problem(doses, costs, samples, r, v, env=None):
+    doses = np.asarray(doses, dtype=float)
+    costs = np.asarray(costs, dtype=float)
+    model = saa_model(samples, r, v, env)
+
+    def sample(rng):
+        rows = rng.choice(len(doses), samples, replace=False)
+        return doses[rows], costs[rows]
+
+    def solve(data):
+        return solve_sample(model, *data)
+
+    def evaluate(data, capacity):
+        demand, cost = data
+        margin = r - cost
+        return float(np.mean(margin * capacity - margin * np.maximum(demand - capacity, 0)
+                             - (margin + v) * np.maximum(capacity - demand, 0)))
+
+    return sample, solve, evaluate
+
+
+# The problem of a trial worker process (or of the main process without a pool)
+_worker = {}
+
+
+# make_problem(env) returns the functions sample(rng), solve(data) ->
+# (objective, decision) and evaluate(data, decision) -> objective. It is
+# called once per worker, so a model built there is re-used by every trial.
+def _init_worker(make_problem, threads):
+    env = gb.Env(empty=True)
+    env.setParam("OutputFlag", 0)
+    env.setParam("Threads", threads)
+    env.start()
+    _worker.clear()
+    _worker.update(env=env, problem=make_problem(env=env))
+
+
+# One trial from its own seed: the SAA objective and decision, and the
+# objective of the candidate decision on the same sample
+def _run_trial(task):
+    seed, candidate = task
+    sample, solve, evaluate = _worker["problem"]
+    data = sample(np.random.default_rng(seed))
+    objective, decision = solve(data)
+    value = np.nan if candidate is None else evaluate(data, candidate)
+    return objective, decision, value
+
+
+# The half-width of a confidence interval on the mean (one- or two-sided)
+def _half_width(values, confidence, two_sided=True):
+    n = len(values)
+    if n < 2:
+        return np.inf
+    level = 0.5 + confidence / 2 if two_sided else confidence
+    return st.t.ppf(level, n - 1) * np.std(values, ddof=1) / np.sqrt(n)
+
+
+# Run SAA trials over a process pool and estimate the optimality gap of a
+# candidate decision. Every trial draws its sample from its own child of one
+# SeedSequence, so the results depend on the seed but not on the number of
+# workers. The candidate (if not given) is the SAA decision of a pilot trial.
+#
+# Each trial j solves its SAA problem (objective z_j) and evaluates the
+# candidate on the same sample (f_j). The mean of z_j bounds the optimum from
+# below when minimizing (from above when maximizing), the mean of f_j
+# estimates the candidate's true objective, and the paired differences give
+# the gap with a one-sided confidence bound. With a tolerance the runner
+# stops, after min_trials, at the first batch where that bound is below tol.
+def run_trials(make_problem, num_trials, sense=GRB.MINIMIZE, seed=None, candidate=None, workers=1, threads=1,
+               batch_size=None, tol=None, confidence=0.95, min_trials=10):
+    seeds = np.random.SeedSequence(seed).spawn(num_trials + 1)
+    sign = 1.0 if sense == GRB.MINIMIZE else -1.0
+    if batch_size is None:
+        batch_size = 4 * max(1, workers)
+
+    # The worker pool, or the same worker state in this process
+    pool = None
+    if workers > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(make_problem, threads))
+    else:
+        _init_worker(make_problem, threads)
+    run = pool.map if pool else map
+
+    results = []
+    try:
+        if candidate is None:
+            candidate = next(iter(run(_run_trial, [(seeds[0], None)])))[1]
+
+        for k in range(1, num_trials + 1, batch_size):
+            results += run(_run_trial, [(s, candidate) for s in seeds[k:min(k + batch_size, num_trials + 1)]])
+
+            gaps = sign * np.array([r[2] - r[0] for r in results])
+            if tol is not None and len(results) >= min_trials and gaps.mean() + _half_width(gaps, confidence, False) <= tol:
+                break
+    finally:
+        if pool:
+            pool.shutdown()
+
+    objectives = np.array([r[0] for r in results])
+    values = np.array([r[2] for r in results])
+    gaps = sign * (values - objectives)
+
+    # The SAA mean bounds the optimum; the candidate's mean objective is on the other side
+    optimum = (float(objectives.mean()), float(_half_width(objectives, confidence)))
+    estimate = (float(values.mean()), float(_half_width(values, confidence)))
+    (lower, lower_half), (upper, upper_half) = (optimum, estimate) if sign > 0 else (estimate, optimum)
+
+    return {"trials": len(results), "objectives": objectives, "decisions": np.array([r[1] for r in results]),
+            "values": values, "candidate": candidate,
+            "lower": lower, "lower_ci": (lower - lower_half, lower + lower_half),
+            "upper": upper, "upper_ci": (upper - upper_half, upper + upper_half),
+            "gap": float(gaps.mean()), "gap_ci": float(gaps.mean() + _half_width(gaps, confidence, False))}
@@ -1,48 +1,212 @@
-import random
 import math
+import warnings
+from functools import partial
+
 import numpy
+from scipy.stats import norm
+
+import streaming
+import variancereduction
 
 # Should we calculate and report the SE?
 CALCULATE_SE = True
 
-def simulate_monthly_sales(selling_weeks_left, target, trials=2000):
-    
-    # A metric to track in how many trials the target is achieved
-    target_achieved = 0
-        
-    for trial in range(trials):
-        
-        # The total number of sales ($) during the selling days
-        sales_cumulative = 0 
-        
-        # The number of selling weeks
-        for week in range(selling_weeks_left):
-            
-            # The number of sales per week
-            number_of_sales = numpy.random.poisson(5)
-            
-            # The size of each sale 
-            for sales in range(number_of_sales):            
-                sales_cumulative += random.lognormvariate(6, 3)       # Generates a lognormal random variate           
-        
-        # After the remaining selling horizon, is the target achieved?
-        if (sales_cumulative >= target):
-            target_achieved += 1
-            
-    # Return the probability that the target is achieved over all trials
-    return target_achieved/trials
+# Simulate batches of trials until the 95% confidence interval half-width of
+# the probability is this small (None: run a fixed number of trials)
+TARGET_HALF_WIDTH = None
+BATCH_SIZE = 100000
+SEED = None
+
+# Compare with antithetic and control variates?
+VARIANCE_REDUCTION = False
+
+# Control variates: the number of sales of at least these fractions of the target
+CONTROL_FRACTIONS = [1, 1/2, 1/4, 1/8, 1/16]
+
+# Report the chance of reaching each of these targets ($) with 1 to 9 weeks left?
+GRID = False
+GRID_TARGETS = [50000, 100000, 187000, 250000, 500000, 1000000]
+GRID_TRIALS = 1000000
+
+# Estimate the chance of a far-off target by importance sampling?
+IMPORTANCE_SAMPLING = False
+RARE_TARGET = 10**9
+IS_TRIALS = 100000
+
+# Sums of consecutive runs of a flat array, counts[i] values per run (runs
+# may be empty, which np.add.reduceat alone does not handle)
+def segment_sums(values, counts):
+    counts = numpy.asarray(counts).ravel()
+    sums = numpy.zeros(len(counts))
+    nonempty = counts > 0
+    if nonempty.any():
+        starts = numpy.concatenate([[0], numpy.cumsum(counts)[:-1]])
+        sums[nonempty] = numpy.add.reduceat(values, starts[nonempty])
+    return sums
+
+# The compound Poisson-lognormal sales ($) of trials simulated over a number
+# of selling weeks, all at once: the weekly Poisson counts as one array, the
+# sale sizes as one flat array and the weekly totals by np.add.reduceat.
+# Returns the cumulative sales after each week (one row per trial).
+def simulate_sales(rng, trials, selling_weeks_left):
+    number_of_sales = rng.poisson(5, (trials, selling_weeks_left))
+    sizes = rng.lognormal(6, 3, number_of_sales.sum())
+    weekly = segment_sums(sizes, number_of_sales).reshape(trials, selling_weeks_left)
+    return numpy.cumsum(weekly, axis=1)
+
+# Whether the target is achieved (1) or not (0) in each of the trials
+def target_achieved(rng, trials, selling_weeks_left, target):
+    return (simulate_sales(rng, trials, selling_weeks_left)[:, -1] >= target).astype(float)
+
+# The probability of reaching each target within each horizon (weeks left),
+# from one simulation over the longest horizon: P[h, t] = P(sales >= targets[t]
+# after horizons[h] weeks). The trials are simulated in chunks, so memory
+# stays bounded for any number of trials.
+def exceedance_grid(rng, trials, horizons, targets, chunk_size=100000):
+    horizons = numpy.asarray(horizons)
+    targets = numpy.asarray(targets, dtype=float)
+    reached = numpy.zeros((len(horizons), len(targets)))
+
+    for start in range(0, trials, chunk_size):
+        size = min(chunk_size, trials - start)
+        cumulative = numpy.sort(simulate_sales(rng, size, horizons.max())[:, horizons - 1], axis=0)
+        for h in range(len(horizons)):
+            reached[h] += size - numpy.searchsorted(cumulative[:, h], targets, side="left")
+
+    return reached / trials
+
+# The target indicators of trials with mirrored sale sizes (z and -z in the
+# lognormal exponent, for antithetic variates) and, per trial, the number of
+# sales of at least each level (for control variates) with their known means
+def target_achieved_pairs(rng, trials, selling_weeks_left, target, levels):
+
+    number_of_sales = rng.poisson(5, (trials, selling_weeks_left)).sum(axis=1)
+    z = rng.standard_normal(number_of_sales.sum())
+    sales = numpy.exp(6 + 3 * z)
+    achieved = (segment_sums(sales, number_of_sales) >= target).astype(float)
+    mirrored = (segment_sums(numpy.exp(6 - 3 * z), number_of_sales) >= target).astype(float)
+    exceedances = numpy.column_stack([segment_sums((sales >= level).astype(float), number_of_sales) for level in levels])
+
+    # The sales at or above a level are Poisson with the mean number of sales
+    # times the chance that one sale reaches the level
+    means = 5 * selling_weeks_left * norm.sf((numpy.log(levels) - 6) / 3)
+    return achieved, mirrored, exceedances, means
+
+# The log of the tilted over the nominal density of a sale's lognormal
+# exponent (nominal: normal with mean 6 and standard deviation 3)
+def log_density_ratio(x, mu, sigma):
+    return -((x - mu) / sigma) ** 2 / 2 + ((x - 6) / 3) ** 2 / 2 - numpy.log(sigma / 3)
+
+# Trials under the importance sampling distribution: the weekly counts are
+# Poisson(rate) and in every trial with sales one sale, chosen at random,
+# has its exponent drawn from normal(mu, sigma) (a big jump, which is how a
+# lognormal total reaches a far target). Returns the total sales, the sale
+# counts, the largest exponent and the log likelihood ratio of each trial.
+def simulate_tilted(rng, trials, selling_weeks_left, rate, mu, sigma):
+    number_of_sales = rng.poisson(rate, (trials, selling_weeks_left)).sum(axis=1)
+    x = rng.normal(6, 3, number_of_sales.sum())
+    starts = numpy.concatenate([[0], numpy.cumsum(number_of_sales)[:-1]])
+    any_sales = number_of_sales > 0
+    x[starts[any_sales] + rng.integers(0, number_of_sales[any_sales])] = rng.normal(mu, sigma, any_sales.sum())
+    sales = segment_sums(numpy.exp(x), number_of_sales)
+
+    # Every sale is equally likely to be the tilted one, so the likelihood
+    # ratio of the sizes is N over the sum of the density ratios
+    log_weight = number_of_sales * numpy.log(5 / rate) - (5 - rate) * selling_weeks_left
+    ratios = segment_sums(numpy.exp(log_density_ratio(x, mu, sigma)), number_of_sales)
+    log_weight[any_sales] += numpy.log(number_of_sales[any_sales]) - numpy.log(ratios[any_sales])
+
+    largest = numpy.full(trials, -numpy.inf)
+    largest[any_sales] = numpy.maximum.reduceat(x, starts[any_sales])
+    return sales, number_of_sales, largest, log_weight
+
+# Choose the tilt (rate, mu, sigma) by the cross-entropy method: raise the
+# level to the 1 - rho quantile of the simulated sales until it reaches the
+# target, each time fitting the tilt to the likelihood-ratio weighted trials
+# above the level. Keeping sigma at least min_sigma lets the level keep rising.
+# If the level is still short of the target after max_iterations, the tilt is
+# returned with a warning: its estimates may then be far off.
+def cross_entropy_tilt(rng, selling_weeks_left, target, rho=0.1, trials=10000, max_iterations=50, min_sigma=1.0):
+    rate, mu, sigma = 5.0, 6.0, 3.0
+    for iteration in range(max_iterations):
+        sales, number_of_sales, largest, log_weight = simulate_tilted(rng, trials, selling_weeks_left, rate, mu, sigma)
+        level = min(target, numpy.quantile(sales, 1 - rho))
+        weights = numpy.exp(log_weight) * (sales >= level)
+        rate = weights @ number_of_sales / (selling_weeks_left * weights.sum())
+        mu = weights @ largest / weights.sum()
+        sigma = max(math.sqrt(weights @ (largest - mu) ** 2 / weights.sum()), min_sigma)
+        if level >= target:
+            break
+    else:
+        warnings.warn("The cross-entropy level reached %.3g of the target %.3g in %d iterations"
+                      % (level, target, max_iterations), RuntimeWarning)
+    return rate, mu, sigma
+
+# Importance sampling estimate of P(sales >= target): the mean of the
+# likelihood-ratio weights of the trials that reach the target. Returns the
+# estimate, the effective sample size of the weights and the tilt.
+def importance_sampling(rng, trials, selling_weeks_left, target, tilt=None):
+    if tilt is None:
+        tilt = cross_entropy_tilt(rng, selling_weeks_left, target)
+    sales, _, _, log_weight = simulate_tilted(rng, trials, selling_weeks_left, *tilt)
+    weights = numpy.exp(log_weight) * (sales >= target)
+    estimate = variancereduction.Estimate(weights.mean(), weights.std(ddof=1) / math.sqrt(trials), trials)
+    ess = weights.sum() ** 2 / (weights @ weights) if weights.any() else 0.0
+    return estimate, ess, tilt
+
+# The probability that the target is achieved over all trials, kept for
+# callers of the original function; the script itself uses streaming.sequential
+def simulate_monthly_sales(selling_weeks_left, target, trials=2000, seed=None):
+    return (simulate_sales(numpy.random.default_rng(seed), trials, selling_weeks_left)[:, -1] >= target).mean()
 
 trials = 10000
-prob = simulate_monthly_sales(9, 187000, trials)
-print("The probability is %2.3f." % prob)    
+simulate = partial(target_achieved, selling_weeks_left=9, target=187000)
+if TARGET_HALF_WIDTH is None:
+    stats = streaming.sequential(simulate, 0.0, batch_size=BATCH_SIZE, max_trials=trials, seed=SEED)
+else:
+    stats = streaming.sequential(simulate, TARGET_HALF_WIDTH, batch_size=BATCH_SIZE, seed=SEED)
+trials = stats.count
+prob = stats.mean
+print("The probability is %2.3f over %d trials." % (prob, trials))
 
 
 if CALCULATE_SE:
-    # Calculate the standard error over all trials and print the result 
-    standardDeviation = math.sqrt(prob * (1-prob))
-    standardError = standardDeviation/math.sqrt(trials)
+    # Calculate the standard error over all trials and print the result
+    standardDeviation = math.sqrt(streaming.variance(stats))
+    standardError = streaming.standard_error(stats)
     print("The standard deviation is %2.3f." % standardDeviation)
     print("The standard error is %2.3f." % standardError)
     print("The 90%% confidence interval is (%2.3f, %2.3f)." % (prob -  1.645*standardError , prob + 1.645*standardError))
     print("The 95%% confidence interval is (%2.3f, %2.3f)." % (prob -  1.96*standardError , prob + 1.96*standardError))
-    print("The 99%% confidence interval is (%2.3f, %2.3f)." % (prob -  2.575*standardError , prob + 2.575*standardError))
\ No newline at end of file
+    print("The 99%% confidence interval is (%2.3f, %2.3f)." % (prob -  2.575*standardError , prob + 2.575*standardError))
+
+
+if VARIANCE_REDUCTION:
+    # The same number of draws with each method
+    rng = numpy.random.default_rng(SEED)
+    levels = 187000 * numpy.array(CONTROL_FRACTIONS)
+    achieved, mirrored, exceedances, means = target_achieved_pairs(rng, trials, 9, 187000, levels)
+
+    crudeEstimate = variancereduction.crude(stats)
+    estimates = [("Antithetic", variancereduction.antithetic(achieved[:trials // 2], mirrored[:trials // 2])),
+                 ("Control variates", variancereduction.control_variates(achieved, exceedances, means))]
+    for name, estimate in estimates:
+        print("%s: the probability is %2.3f, standard error %2.4f, variance-reduction factor %2.2f." %
+              (name, estimate.mean, estimate.standard_error, variancereduction.reduction_factor(crudeEstimate, estimate)))
+
+
+if GRID:
+    horizons = numpy.arange(1, 10)
+    grid = exceedance_grid(numpy.random.default_rng(SEED), GRID_TRIALS, horizons, GRID_TARGETS)
+    print("Weeks left " + "".join("%10d" % target for target in GRID_TARGETS))
+    for weeks, row in zip(horizons, grid):
+        print("%10d " % weeks + "".join("%10.3f" % p for p in row))
+
+
+if IMPORTANCE_SAMPLING:
+    estimate, ess, tilt = importance_sampling(numpy.random.default_rng(SEED), IS_TRIALS, 9, RARE_TARGET)
+    relativeError = estimate.standard_error / estimate.mean
+    print("Importance sampling: the probability of reaching %d is %.3e." % (RARE_TARGET, estimate.mean))
+    print("The relative error is %2.4f with an effective sample size of %d out of %d trials." % (relativeError, ess, IS_TRIALS))
+    print("Crude Monte Carlo needs about %.2e trials for the same relative error." % ((1 - estimate.mean) / (estimate.mean * relativeError ** 2)))
+    print("Tilt: %2.3f sales per week, one sale with exponent normal(%2.3f, %2.3f)." % tilt)
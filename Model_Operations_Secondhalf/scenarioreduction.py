@@ -0,0 +1,66 @@
+import numpy as np
+
+
+# Scenarios as a 2-D array with one scenario per row
+def _as_rows(scenarios):
+    scenarios = np.asarray(scenarios, dtype=float)
+    return scenarios[:, None] if scenarios.ndim == 1 else scenarios
+
+
+# Distances between the rows of a and the rows of b, accumulated one
+# dimension at a time so that memory stays at len(a) x len(b)
+def distances(a, b, ord=2):
+    total = np.zeros((len(a), len(b)))
+    for k in range(a.shape[1]):
+        gap = np.abs(a[:, k, None] - b[None, :, k])
+        if ord == np.inf:
+            np.maximum(total, gap, out=total)
+        else:
+            total += gap ** ord
+    return total if ord == np.inf else total ** (1.0 / ord)
+
+
+# Fast forward selection: pick K of the scenarios one at a time, each time
+# the one that most reduces the Kantorovich distance between the original
+# distribution and the distribution on the selected scenarios. The
+# probability of every scenario that is left out moves to its nearest
+# selected scenario.
+#
+# Returns the indices of the selected scenarios, their new probabilities and
+# the Kantorovich distance to the original distribution (the reduction error).
+def fast_forward(scenarios, probabilities, K, ord=2):
+    p = np.asarray(probabilities, dtype=float)
+    n = len(p)
+    K = min(K, n)
+    scenarios = _as_rows(scenarios)
+    cost = distances(scenarios, scenarios, ord)
+    remaining = np.ones(n, dtype=bool)
+    selected = []
+
+    for _ in range(K):
+
+        # The distance that is left if u is selected next, for every candidate u
+        z = (p * remaining) @ cost
+        z[~remaining] = np.inf
+        u = int(np.argmin(z))
+        selected.append(u)
+        remaining[u] = False
+
+        # Distances to the nearest selected scenario
+        cost = np.minimum(cost, cost[:, [u]])
+
+    return redistribute(scenarios, p, selected, ord)
+
+
+# Move the probability of every scenario that is not selected to its nearest
+# selected scenario and measure the Kantorovich distance of the result
+def redistribute(scenarios, probabilities, selected, ord=2):
+    p = np.asarray(probabilities, dtype=float)
+    selected = np.asarray(selected)
+    scenarios = _as_rows(scenarios)
+
+    gaps = distances(scenarios, scenarios[selected], ord)
+    nearest = np.argmin(gaps, axis=1)
+    weights = np.bincount(nearest, weights=p, minlength=len(selected))
+    error = float(p @ gaps[np.arange(len(p)), nearest])
+    return selected, weights, error
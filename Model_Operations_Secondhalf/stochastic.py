@@ -0,0 +1,199 @@
+import math
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gb
+from gurobipy import GRB
+
+from benders import Block
+
+# The first stage of a two-stage model:  cost @ x  with  matrix @ x (sense) rhs.
+# Each scenario's recourse is a Block from benders.py with its own cost, rhs
+# and link (technology) matrix; the recourse matrix and senses are shared by
+# all scenarios (fixed recourse).
+FirstStage = namedtuple("FirstStage", ["cost", "matrix", "sense", "rhs", "vtype"])
+
+
+# Build the extensive form (SP) with every scenario's recourse in one
+# block-diagonal sparse matrix next to the stacked link matrices
+def extensive_form(first, scenarios, probabilities, sense=GRB.MINIMIZE, recourse_vtype=GRB.CONTINUOUS):
+    model = gb.Model("Extensive Form")
+    model.Params.OutputFlag = 0
+    num_first = len(first.cost)
+    num_recourse = len(scenarios[0].cost)
+
+    x = model.addMVar(num_first, vtype=first.vtype, name="x")
+    y = model.addMVar((len(scenarios), num_recourse), vtype=np.broadcast_to(recourse_vtype, (len(scenarios), num_recourse)), name="y")
+
+    # First-stage cost plus the probability-weighted recourse costs
+    recourse_cost = np.array([p * s.cost for p, s in zip(probabilities, scenarios)])
+    model.setObjective(first.cost @ x + recourse_cost.ravel() @ y.reshape(-1), sense)
+
+    if first.matrix is not None:
+        model.addMConstr(first.matrix, x, first.sense, first.rhs)
+
+    # Recourse rows of every scenario: W y_s + T_s x (sense) h_s
+    matrix = sp.hstack([sp.vstack([s.link for s in scenarios]),
+                        sp.block_diag([s.matrix for s in scenarios])], format="csr")
+    model.addMConstr(matrix, gb.hstack((x, y.reshape(-1))),
+                     np.concatenate([s.sense for s in scenarios]),
+                     np.concatenate([s.rhs for s in scenarios]))
+    return model, x, y
+
+
+# A single-scenario model that is built once and then re-used for every
+# wait-and-see, expected-value and EEV solve by swapping the scenario data in
+# place: the recourse costs, the right-hand sides and the link coefficients.
+def scenario_model(first, scenarios, sense=GRB.MINIMIZE, recourse_vtype=GRB.CONTINUOUS, env=None):
+    model = gb.Model("Single Scenario", env=env)
+    model.Params.OutputFlag = 0
+    base = scenarios[0]
+
+    x = model.addMVar(len(first.cost), vtype=first.vtype, name="x")
+    y = model.addMVar(len(base.cost), vtype=recourse_vtype, name="y")
+    model.setObjective(first.cost @ x + base.cost @ y, sense)
+
+    if first.matrix is not None:
+        model.addMConstr(first.matrix, x, first.sense, first.rhs)
+    rows = model.addMConstr(sp.hstack([base.link, base.matrix], format="csr"), gb.hstack((x, y)), base.sense, base.rhs)
+    model.update()
+
+    # The link coefficients that appear in any scenario; these are the only
+    # matrix entries that change between scenarios
+    pattern = sum(abs(sp.csr_matrix(s.link)) for s in scenarios).tocoo()
+
+    model._x, model._y, model._rows = x, y, rows
+    row_list, x_list = rows.tolist(), x.tolist()
+    model._coeffs = [(row_list[r], x_list[c], r, c) for r, c in zip(pattern.row, pattern.col)]
+    model._link = sp.csr_matrix(base.link)
+    return model
+
+
+# Swap the data of one scenario into a scenario model
+def set_scenario(model, scenario):
+    model._y.Obj = scenario.cost
+    model._rows.RHS = scenario.rhs
+    link = sp.csr_matrix(scenario.link)
+    if (link != model._link).nnz:
+        for constr, var, r, c in model._coeffs:
+            model.chgCoeff(constr, var, link[r, c])
+        model._link = link
+
+
+# Solve a scenario model for one scenario and return its objective: +inf
+# (-inf when maximizing) when the scenario is infeasible, as happens in EEV
+# when the recourse is not complete and the fixed first stage cannot be
+# recovered from
+def solve_scenario(model, scenario):
+    set_scenario(model, scenario)
+    model.optimize()
+    if model.Status == GRB.INF_OR_UNBD:
+        model.Params.DualReductions = 0
+        model.optimize()
+        model.Params.DualReductions = 1
+    if model.Status == GRB.INFEASIBLE:
+        return math.inf * model.ModelSense
+    if model.Status != GRB.OPTIMAL:
+        raise RuntimeError("Scenario model ended with status %d" % model.Status)
+    return model.ObjVal
+
+
+# The scenario model of each wait-and-see worker process
+_worker = {}
+
+
+# Give a worker process its own Gurobi environment (capped at a number of
+# threads) and one template scenario model for all of its scenarios
+def _init_worker(first, scenarios, sense, recourse_vtype, threads):
+    env = gb.Env(empty=True)
+    env.setParam("OutputFlag", 0)
+    env.setParam("Threads", threads)
+    env.start()
+    _worker["env"] = env
+    _worker["scenarios"] = scenarios
+    _worker["model"] = scenario_model(first, scenarios, sense, recourse_vtype, env=env)
+
+
+def _solve_chunk(indices):
+    return [solve_scenario(_worker["model"], _worker["scenarios"][k]) for k in indices]
+
+
+# Solve the perfect-foresight problem of every scenario and return the
+# objectives and their probability-weighted sum (WS). With more than one
+# worker the scenarios are split into chunks over a process pool.
+def wait_and_see(first, scenarios, probabilities, sense=GRB.MINIMIZE, recourse_vtype=GRB.CONTINUOUS,
+                 workers=1, threads=1, chunksize=None):
+    probabilities = np.asarray(probabilities, dtype=float)
+
+    if workers <= 1:
+        model = scenario_model(first, scenarios, sense, recourse_vtype)
+        objectives = np.array([solve_scenario(model, s) for s in scenarios])
+        return objectives, float(probabilities @ objectives)
+
+    # Forking keeps scripts without a __main__ guard from being re-run in the workers
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    if chunksize is None:
+        chunksize = max(1, len(scenarios) // (4 * workers))
+    chunks = [range(k, min(k + chunksize, len(scenarios))) for k in range(0, len(scenarios), chunksize)]
+
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(first, scenarios, sense, recourse_vtype, threads)) as pool:
+        objectives = np.concatenate([np.asarray(r, dtype=float) for r in pool.map(_solve_chunk, chunks)])
+    return objectives, float(probabilities @ objectives)
+
+
+# The probability-weighted mean of the scenarios' recourse data
+def expected_scenario(scenarios, probabilities):
+    p = np.asarray(probabilities, dtype=float)
+    return Block(sum(pi * s.cost for pi, s in zip(p, scenarios)),
+                 scenarios[0].matrix,
+                 scenarios[0].sense,
+                 sum(pi * s.rhs for pi, s in zip(p, scenarios)),
+                 sum(pi * sp.csr_matrix(s.link) for pi, s in zip(p, scenarios)))
+
+
+# Solve the extensive form (SP), the wait-and-see problems (WS), the
+# expected-value problem (EV) and the expected result of using the EV
+# solution (EEV) in one run, and derive EVPI and VSS. The WS, EV and EEV
+# solves all share one single-scenario model; with more than one worker the
+# wait-and-see problems are solved in parallel (see wait_and_see).
+def analyze(first, scenarios, probabilities, sense=GRB.MINIMIZE, recourse_vtype=GRB.CONTINUOUS, workers=1, threads=1):
+    probabilities = np.asarray(probabilities, dtype=float)
+
+    # The stochastic solution
+    sp_model, x, _ = extensive_form(first, scenarios, probabilities, sense, recourse_vtype)
+    sp_model.optimize()
+    SP = sp_model.ObjVal
+    x_sp = x.X
+
+    single = scenario_model(first, scenarios, sense, recourse_vtype)
+    x_single = single._x
+
+    # Wait and see: every scenario with perfect foresight
+    if workers > 1:
+        _, WS = wait_and_see(first, scenarios, probabilities, sense, recourse_vtype, workers, threads)
+    else:
+        WS = float(probabilities @ [solve_scenario(single, s) for s in scenarios])
+
+    # Expected value problem, then its first-stage decisions fixed in every scenario
+    # (an infeasible scenario makes EEV and VSS infinite)
+    EV = solve_scenario(single, expected_scenario(scenarios, probabilities))
+    if math.isinf(EV):
+        x_ev, EEV = None, EV
+    else:
+        x_ev = x_single.X
+        bounds = x_single.LB, x_single.UB
+        x_single.LB = x_single.UB = x_ev
+        EEV = float(probabilities @ [solve_scenario(single, s) for s in scenarios])
+        x_single.LB, x_single.UB = bounds
+
+    # Information and stochastic solution values are non-negative in either sense
+    sign = 1.0 if sense == GRB.MINIMIZE else -1.0
+    return {"SP": SP, "WS": WS, "EV": EV, "EEV": EEV,
+            "EVPI": sign * (SP - WS), "VSS": sign * (EEV - SP),
+            "x_sp": x_sp, "x_ev": x_ev}
@@ -0,0 +1,108 @@
+import math
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.stats as st
+
+# Streaming mean and variance: the number of observations, their mean and the
+# sum of squared deviations from the mean (Welford). Two summaries merge
+# exactly (Chan et al.), so batches and worker processes can be summarized
+# separately and combined without keeping the observations or forming the
+# large, cancelling sums of x and x^2.
+Stats = namedtuple("Stats", ["count", "mean", "m2"])
+
+EMPTY = Stats(0, 0.0, 0.0)
+
+
+# Combine two summaries
+def merge(a, b):
+    count = a.count + b.count
+    if count == 0:
+        return EMPTY
+    delta = b.mean - a.mean
+    mean = a.mean + delta * b.count / count
+    m2 = a.m2 + b.m2 + delta * delta * a.count * b.count / count
+    return Stats(count, mean, m2)
+
+
+# Add observations (one value or an array) to a summary
+def update(stats, values):
+    values = np.asarray(values, dtype=float).ravel()
+    if len(values) == 0:
+        return stats
+    mean = values.mean()
+    deviations = values - mean
+    return merge(stats, Stats(len(values), float(mean), float(deviations @ deviations)))
+
+
+def variance(stats):
+    return stats.m2 / (stats.count - 1) if stats.count > 1 else math.nan
+
+
+def standard_error(stats):
+    return math.sqrt(variance(stats) / stats.count) if stats.count > 1 else math.inf
+
+
+# The half-width of a two-sided normal confidence interval on the mean
+def half_width(stats, confidence=0.95):
+    return st.norm.ppf(0.5 + confidence / 2) * standard_error(stats)
+
+
+def interval(stats, confidence=0.95):
+    width = half_width(stats, confidence)
+    return stats.mean - width, stats.mean + width
+
+
+# The simulator of each sampling worker process
+_worker = {}
+
+
+def _init_worker(simulate):
+    _worker["simulate"] = simulate
+
+
+def _run_batch(task):
+    seed, size = task
+    return update(EMPTY, _worker["simulate"](np.random.default_rng(seed), size))
+
+
+# Sequential sampling: simulate(rng, size) returns the outcomes of size
+# trials, and batches are drawn until the confidence interval on the mean is
+# no wider than target (a half-width), or max_trials is reached. Every batch
+# has its own child of one SeedSequence; with more than one worker each round
+# simulates one batch per worker and merges their summaries.
+#
+# Returns the summary of all trials (Stats; count is the number of trials).
+def sequential(simulate, target, batch_size=100000, confidence=0.95, min_trials=1000, max_trials=10**9,
+               seed=None, workers=1):
+    seeds = np.random.SeedSequence(seed)
+    stats = EMPTY
+
+    pool = None
+    if workers > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(simulate,))
+    else:
+        _init_worker(simulate)
+
+    try:
+        while stats.count < max_trials:
+            sizes = []
+            left = max_trials - stats.count
+            for _ in range(max(1, workers)):
+                sizes.append(min(batch_size, left))
+                left -= sizes[-1]
+                if left == 0:
+                    break
+            tasks = list(zip(seeds.spawn(len(sizes)), sizes))
+            for batch in (pool.map(_run_batch, tasks) if pool else map(_run_batch, tasks)):
+                stats = merge(stats, batch)
+            if stats.count >= min_trials and half_width(stats, confidence) <= target:
+                break
+    finally:
+        if pool:
+            pool.shutdown()
+    return stats
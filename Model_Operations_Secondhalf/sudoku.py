@@ -0,0 +1,360 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gb
+from gurobipy import GRB
+
+# Sudoku boards are (N x N) integer arrays with N = box_size^2, holding the
+# values 1..N and 0 for an empty cell. Candidates are (N x N x N) boolean
+# arrays: cands[r, c, v - 1] is True while v can still go in cell (r, c).
+
+
+# A valid solved board: row r is the first row shifted by box_size * (r % box_size) + r // box_size
+def canonical(box_size):
+    n = box_size * box_size
+    r = np.arange(n)[:, None]
+    c = np.arange(n)[None, :]
+    return (box_size * (r % box_size) + r // box_size + c) % n + 1
+
+
+# A random board of the same family as a solved board: relabel the symbols,
+# shuffle the rows within each band and the bands, the columns within each
+# stack and the stacks, and transpose half of the time. Every step keeps the
+# board valid, so no solver is needed.
+def randomize(board, box_size, rng):
+    n = box_size * box_size
+    board = np.concatenate([[0], rng.permutation(n) + 1])[board]
+
+    def order():
+        bands = rng.permutation(box_size)
+        return np.concatenate([band * box_size + rng.permutation(box_size) for band in bands])
+
+    board = board[order()][:, order()]
+    return board.T.copy() if rng.random() < 0.5 else board
+
+
+# The candidate cube of a board (all values of empty cells, the value of filled ones)
+def candidates(board):
+    n = len(board)
+    cands = np.ones((n, n, n), dtype=bool)
+    filled = board > 0
+    cands[filled] = False
+    cands[filled, board[filled] - 1] = True
+    return cands
+
+
+# How often every value is placed in every row, column and box, as (unit, value) counts
+def _placed(cands, filled, box_size):
+    n = len(filled)
+    placed = cands & filled[:, :, None]
+    rows = placed.sum(axis=1)
+    cols = placed.sum(axis=0)
+    boxes = placed.reshape(box_size, box_size, box_size, box_size, n).sum(axis=(1, 3))
+    return rows, cols, boxes
+
+
+# Expand per-box (box row, box column, value) masks to the cells
+def _box_cells(boxes, box_size):
+    return np.repeat(np.repeat(boxes, box_size, axis=0), box_size, axis=1)
+
+
+# Constraint propagation: repeatedly remove the values placed in a cell's row,
+# column and box from its candidates, then apply
+#   - naked singles:  a cell with one candidate left takes it,
+#   - hidden singles: a value with one possible cell left in a unit goes there,
+#   - box-line reduction: a value confined to one row (column) of a box is
+#     removed from the rest of that row (column), and a value confined to one
+#     box within a row (column) is removed from the rest of that box,
+# until nothing changes. Returns the board and candidates reached, or None
+# when the board has no solution.
+def propagate(board, box_size, cands=None):
+    n = box_size * box_size
+    board = np.array(board)
+    cands = candidates(board) if cands is None else cands.copy()
+
+    while True:
+        before = cands.sum()
+        filled = board > 0
+
+        # Singles placed in the same pass may clash: no value twice in a unit
+        rows, cols, boxes = _placed(cands, filled, box_size)
+        if (rows > 1).any() or (cols > 1).any() or (boxes > 1).any():
+            return None
+
+        # Eliminate placed values from the peers of every empty cell
+        rows, cols, boxes = rows > 0, cols > 0, boxes > 0
+        used = rows[:, None, :] | cols[None, :, :] | _box_cells(boxes, box_size)
+        cands[~filled] &= ~used[~filled]
+
+        # Every empty cell needs a candidate and every unit every value
+        free = cands & ~filled[:, :, None]
+        if (cands.sum(axis=2) == 0).any():
+            return None
+        box_free = free.reshape(box_size, box_size, box_size, box_size, n).any(axis=(1, 3))
+        if ((~rows & ~free.any(axis=1)).any() or (~cols & ~free.any(axis=0)).any()
+                or (~boxes & ~box_free).any()):
+            return None
+
+        # Naked singles
+        single = ~filled & (cands.sum(axis=2) == 1)
+        board[single] = cands[single].argmax(axis=1) + 1
+
+        # Hidden singles in rows, columns and boxes
+        for r, v in zip(*np.nonzero(free.sum(axis=1) == 1)):
+            c = free[r, :, v].argmax()
+            if board[r, c] == 0:
+                board[r, c] = v + 1
+                cands[r, c] = False
+                cands[r, c, v] = True
+        for c, v in zip(*np.nonzero(free.sum(axis=0) == 1)):
+            r = free[:, c, v].argmax()
+            if board[r, c] == 0:
+                board[r, c] = v + 1
+                cands[r, c] = False
+                cands[r, c, v] = True
+        box_view = free.reshape(box_size, box_size, box_size, box_size, n)
+        for br, bc, v in zip(*np.nonzero(box_view.sum(axis=(1, 3)) == 1)):
+            i, j = np.argwhere(box_view[br, :, bc, :, v])[0]
+            r, c = br * box_size + i, bc * box_size + j
+            if board[r, c] == 0:
+                board[r, c] = v + 1
+                cands[r, c] = False
+                cands[r, c, v] = True
+
+        # Box-line reduction, once the placements are eliminated from the peers
+        if (board > 0).sum() > filled.sum():
+            continue
+        free = cands & ~filled[:, :, None]
+        box_view = free.reshape(box_size, box_size, box_size, box_size, n)
+        in_rows = box_view.any(axis=3)     # (box row, row in box, box column, value)
+        in_cols = box_view.any(axis=1)     # (box row, box column, column in box, value)
+        for br, bc, v in zip(*np.nonzero(in_rows.sum(axis=1) == 1)):
+            r = br * box_size + in_rows[br, :, bc, v].argmax()
+            outside = np.ones(n, dtype=bool)
+            outside[bc * box_size:(bc + 1) * box_size] = False
+            cands[r, outside & (board[r] == 0), v] = False
+        for br, bc, v in zip(*np.nonzero(in_cols.sum(axis=2) == 1)):
+            c = bc * box_size + in_cols[br, bc, :, v].argmax()
+            outside = np.ones(n, dtype=bool)
+            outside[br * box_size:(br + 1) * box_size] = False
+            cands[outside & (board[:, c] == 0), c, v] = False
+
+        row_boxes = free.reshape(n, box_size, box_size, n).any(axis=2)       # (row, box column, value)
+        for r, v in zip(*np.nonzero(row_boxes.sum(axis=1) == 1)):
+            bc = row_boxes[r, :, v].argmax()
+            br, i = divmod(r, box_size)
+            block = cands[br * box_size:(br + 1) * box_size, bc * box_size:(bc + 1) * box_size, v]
+            keep = block[i].copy()
+            block[(board[br * box_size:(br + 1) * box_size, bc * box_size:(bc + 1) * box_size] == 0)] = False
+            block[i] = keep
+        col_boxes = free.reshape(box_size, box_size, n, n).any(axis=1)       # (box row, column, value)
+        for c, v in zip(*np.nonzero(col_boxes.sum(axis=0) == 1)):
+            br = col_boxes[:, c, v].argmax()
+            bc, j = divmod(c, box_size)
+            block = cands[br * box_size:(br + 1) * box_size, bc * box_size:(bc + 1) * box_size, v]
+            keep = block[:, j].copy()
+            block[(board[br * box_size:(br + 1) * box_size, bc * box_size:(bc + 1) * box_size] == 0)] = False
+            block[:, j] = keep
+
+        if cands.sum() == before:
+            return board, cands
+
+
+# The exact-cover view of the candidates left open: the options (r, c, v) and
+# the four items each one covers, the cell and its (row, value), (column,
+# value) and (box, value), as integer keys
+def _options(cands, empty, box_size):
+    n = box_size * box_size
+    r, c, v = np.nonzero(cands & empty[:, :, None])
+    b = (r // box_size) * box_size + c // box_size
+    keys = [r * n + c, n * n + r * n + v, 2 * n * n + c * n + v, 3 * n * n + b * n + v]
+    return r, c, v, keys
+
+
+# Solve a board with a MIP over the cells that propagation leaves open: one
+# binary variable per remaining candidate, one row per empty cell and one per
+# (unit, value) still to be placed. Returns up to limit solutions (a second
+# one is searched for with a cut that excludes the first), so limit=2 tells
+# whether the solution is unique. Raises TimeoutError when time_limit seconds
+# pass before the search is settled.
+def solve_mip(board, box_size, limit=1, env=None, time_limit=None):
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    reached = propagate(board, box_size)
+    if reached is None:
+        return []
+    board, cands = reached
+    empty = board == 0
+    if not empty.any():
+        return [board]
+
+    r, c, v, keys = _options(cands, empty, box_size)
+    rows = np.concatenate(keys)
+    used, rows = np.unique(rows, return_inverse=True)
+    matrix = sp.csr_matrix((np.ones(len(rows)), (rows, np.tile(np.arange(len(r)), 4))), shape=(len(used), len(r)))
+
+    model = gb.Model("Sudoku", env=env)
+    model.Params.OutputFlag = 0
+    x = model.addMVar(len(r), vtype=GRB.BINARY, name="Cell Value")
+    model.addMConstr(matrix, x, "=", np.ones(len(used)))
+
+    solutions = []
+    while len(solutions) < limit:
+        if deadline is not None:
+            model.Params.TimeLimit = max(0.0, deadline - time.perf_counter())
+        model.optimize()
+        if model.SolCount == 0:
+            if model.Status == GRB.TIME_LIMIT:
+                raise TimeoutError("Sudoku MIP hit its time limit")
+            break
+        chosen = x.X > 0.5
+        solution = board.copy()
+        solution[r[chosen], c[chosen]] = v[chosen] + 1
+        solutions.append(solution)
+
+        # Exclude this solution
+        model.addConstr(x[np.flatnonzero(chosen)].sum() <= chosen.sum() - 1)
+    return solutions
+
+
+# Cover an option in the exact-cover problem of algorithm_x: remove its
+# items and every option that clashes with it. Returns the removed sets.
+def _cover(items, options, option):
+    removed = []
+    for item in options[option]:
+        for other in items[item]:
+            for clash in options[other]:
+                if clash != item:
+                    items[clash].remove(other)
+        removed.append(items.pop(item))
+    return removed
+
+
+# Undo _cover, restoring the sets in reverse order
+def _uncover(items, options, option, removed):
+    for item in reversed(options[option]):
+        items[item] = removed.pop()
+        for other in items[item]:
+            for clash in options[other]:
+                if clash != item:
+                    items[clash].add(other)
+
+
+# Algorithm X (Knuth) on the exact-cover problem: items maps every item to the
+# set of options that cover it, options lists the items of every option.
+# _cover and _uncover update the sets in place, playing the role of the
+# dancing links. The item with the fewest options is branched on
+# first, which covers both naked and hidden singles. The search is iterative
+# (one option iterator per level) since a 25 x 25 board can be 600 levels deep.
+#
+# Returns up to limit solutions, each a list of options, or raises
+# TimeoutError once time.perf_counter() passes deadline.
+def algorithm_x(items, options, limit=1, deadline=None):
+    if not items:
+        return [[]]
+
+    solutions, chosen, removed = [], [], []
+    stack = [iter(list(items[min(items, key=lambda item: len(items[item]))]))]
+    while stack:
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError("Algorithm X hit its time limit")
+        option = next(stack[-1], None)
+        if len(chosen) == len(stack):
+            _uncover(items, options, chosen.pop(), removed.pop())
+        if option is None:
+            stack.pop()
+            continue
+
+        removed.append(_cover(items, options, option))
+        chosen.append(option)
+        if not items:
+            solutions.append(list(chosen))
+            if len(solutions) == limit:
+                return solutions
+            continue
+        stack.append(iter(list(items[min(items, key=lambda item: len(items[item]))])))
+    return solutions
+
+
+# Solve a board as an exact-cover problem with Algorithm X over the cells
+# that propagation leaves open; same interface as solve_mip
+def solve_exact_cover(board, box_size, limit=1, time_limit=None):
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    reached = propagate(board, box_size)
+    if reached is None:
+        return []
+    board, cands = reached
+    empty = board == 0
+    if not empty.any():
+        return [board]
+
+    r, c, v, keys = _options(cands, empty, box_size)
+    options = np.stack(keys, axis=1).tolist()
+    items = {}
+    for option, covered in enumerate(options):
+        for item in covered:
+            items.setdefault(item, set()).add(option)
+
+    solutions = []
+    for chosen in algorithm_x(items, options, limit, deadline):
+        solution = board.copy()
+        solution[r[chosen], c[chosen]] = v[chosen] + 1
+        solutions.append(solution)
+    return solutions
+
+
+# Solve a board with one of the backends, "mip" (see solve_mip) or
+# "exact-cover" (see solve_exact_cover). limit=2 checks uniqueness.
+def solve(board, box_size, limit=1, backend="mip", env=None, time_limit=None):
+    if backend == "mip":
+        return solve_mip(board, box_size, limit, env, time_limit)
+    if backend == "exact-cover":
+        return solve_exact_cover(board, box_size, limit, time_limit)
+    raise ValueError("Unknown Sudoku backend %r" % backend)
+
+
+# A random solved board: the canonical board randomized by symbol, row and
+# column permutations. With seeds > 0 that many random cells of an empty
+# board are first given random values (as long as propagation accepts them)
+# and the board is completed by the solver, which reaches boards outside the
+# canonical family. Seeds that leave the board without a solution, or whose
+# completion takes longer than time_limit seconds, are drawn again, up to
+# max_tries times: the search times are heavy-tailed (Algorithm X can take a
+# minute on a 25 x 25 board that a fresh draw completes in a second), so a
+# short limit with restarts bounds the cost.
+def generate(box_size, rng, seeds=0, backend="mip", env=None, max_tries=10, time_limit=None):
+    n = box_size * box_size
+    if seeds == 0:
+        return randomize(canonical(box_size), box_size, rng)
+
+    for attempt in range(max_tries):
+        board = np.zeros((n, n), dtype=int)
+        cands = candidates(board)
+        for cell in rng.permutation(n * n)[:seeds]:
+            r, c = divmod(cell, n)
+            if board[r, c] or not cands[r, c].any():
+                continue
+            v = rng.choice(np.flatnonzero(cands[r, c]))
+            trial, trial_cands = board.copy(), cands.copy()
+            trial[r, c] = v + 1
+            trial_cands[r, c] = False
+            trial_cands[r, c, v] = True
+            reached = propagate(trial, box_size, trial_cands)
+            if reached is not None:
+                board, cands = reached
+
+        try:
+            solutions = solve(board, box_size, 1, backend, env, time_limit)
+        except TimeoutError:
+            continue
+        if solutions:
+            return randomize(solutions[0], box_size, rng)
+    raise RuntimeError("No Sudoku board completes %d random seeds in %d tries" % (seeds, max_tries))
+
+
+# Whether a full board is a valid solution
+def is_valid(board, box_size):
+    n = box_size * box_size
+    target = np.arange(1, n + 1)
+    boxes = board.reshape(box_size, box_size, box_size, box_size).transpose(0, 2, 1, 3).reshape(n, n)
+    return all((np.sort(units, axis=1) == target).all() for units in (board, board.T, boxes))
@@ -0,0 +1,112 @@
+import csv
+import time
+
+import numpy as np
+import gurobipy as gb
+
+import sudoku
+
+# The board sizes and clue densities (fraction of cells given) to compare,
+# the puzzles per combination and the time allowed per uniqueness check.
+# The MIP is only run while the candidates left open by propagation (its
+# binary variables) stay below MIP_MAX, which fits a size-limited license.
+BOX_SIZES = [3, 4, 5]
+CLUE_FRACTIONS = [0.8, 0.6, 0.5, 0.4, 0.3]
+PUZZLES = 5
+TIME_LIMIT = 30
+MIP_MAX = 2000
+SEED = 0
+OUTPUT = 'sudoku_benchmark.csv'
+
+# Seeded board generation (see sudoku.generate): the random clues placed per
+# box size, the boards per combination and the seconds allowed per try before
+# the seeds are drawn again
+GENERATE_SEEDS = {3: 20, 4: 40, 5: 25}
+BOARDS = 5
+TRY_SECONDS = 5
+GENERATE_OUTPUT = 'sudoku_generate_benchmark.csv'
+
+BACKENDS = ['mip', 'exact-cover']
+FIELDS = ['box_size', 'clues', 'puzzle', 'backend', 'open_cells', 'open_candidates', 'status', 'seconds']
+GENERATE_FIELDS = ['box_size', 'seeds', 'board', 'backend', 'status', 'seconds']
+
+
+# A puzzle: a random solved board with the given fraction of its cells kept
+def instance(box_size, clues, puzzle, seed=SEED):
+    rng = np.random.default_rng([seed, box_size, int(round(clues * 100)), puzzle])
+    board = sudoku.generate(box_size, rng)
+    n = box_size * box_size
+    hidden = rng.permutation(n * n)[:n * n - int(round(clues * n * n))]
+    board.flat[hidden] = 0
+    return board
+
+
+# Check the uniqueness of one puzzle (search for up to two solutions) with one backend
+def run(box_size, clues, puzzle, backend, env):
+    board = instance(box_size, clues, puzzle)
+    reached = sudoku.propagate(board, box_size)
+    open_cells = int((reached[0] == 0).sum())
+    open_candidates = int((reached[1] & (reached[0] == 0)[:, :, None]).sum())
+
+    row = {'box_size': box_size, 'clues': clues, 'puzzle': puzzle, 'backend': backend,
+           'open_cells': open_cells, 'open_candidates': open_candidates}
+    if backend == 'mip' and open_candidates > MIP_MAX:
+        return dict(row, status='skipped', seconds=None)
+
+    start = time.perf_counter()
+    try:
+        solutions = sudoku.solve(board, box_size, limit=2, backend=backend, env=env, time_limit=TIME_LIMIT)
+        status = {0: 'infeasible', 1: 'unique', 2: 'multiple'}[len(solutions)]
+    except TimeoutError:
+        status = 'time limit'
+    return dict(row, status=status, seconds=time.perf_counter() - start)
+
+
+# Generate one seeded board with one backend. A size-limited license cannot
+# build the larger MIPs; that is recorded rather than raised.
+def run_generate(box_size, seeds, board, backend, env):
+    rng = np.random.default_rng([SEED, box_size, seeds, board])
+    row = {'box_size': box_size, 'seeds': seeds, 'board': board, 'backend': backend}
+    start = time.perf_counter()
+    try:
+        sudoku.generate(box_size, rng, seeds=seeds, backend=backend, env=env, time_limit=TRY_SECONDS)
+        status = 'generated'
+    except RuntimeError:
+        status = 'no board'
+    except gb.GurobiError as error:
+        status = 'gurobi error %d' % error.errno
+    return dict(row, status=status, seconds=time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    grid = [(box_size, clues, puzzle, backend) for box_size in BOX_SIZES for clues in CLUE_FRACTIONS
+            for puzzle in range(PUZZLES) for backend in BACKENDS]
+
+    # One environment for every MIP, run one after another so timings do not interfere
+    with gb.Env(empty=True) as env, open(OUTPUT, 'w', newline='') as f:
+        env.setParam('OutputFlag', 0)
+        env.setParam('Threads', 1)
+        env.start()
+
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for args in grid:
+            row = run(*args, env)
+            writer.writerow(row)
+            f.flush()
+            seconds = '-' if row['seconds'] is None else f"{row['seconds']:.3f}s"
+            print(f"box {row['box_size']}, clues {row['clues']:.0%}, puzzle {row['puzzle']} ({row['backend']}): "
+                  f"{row['open_cells']} open cells, {row['status']} in {seconds}")
+
+        # Seeded generation, where a slow completion costs the whole board
+        with open(GENERATE_OUTPUT, 'w', newline='') as g:
+            writer = csv.DictWriter(g, fieldnames=GENERATE_FIELDS)
+            writer.writeheader()
+            for box_size in BOX_SIZES:
+                for board in range(BOARDS):
+                    for backend in BACKENDS:
+                        row = run_generate(box_size, GENERATE_SEEDS[box_size], board, backend, env)
+                        writer.writerow(row)
+                        g.flush()
+                        print(f"box {row['box_size']}, {row['seeds']} seeds, board {row['board']} ({row['backend']}): "
+                              f"{row['status']} in {row['seconds']:.3f}s")
@@ -1,12 +1,29 @@
 import gurobipy as gb
 import matplotlib.pyplot as plt
 import random
+import time
+import numpy as np
+import sudoku
 
 # How many feasible solutions to generate?
 ONE_FEASIBLE = 10
 
-# Create a new model
-model = gb.Model("Sudoku Engine")
+# Generate the board with the propagation engine (True) or by enumerating a
+# pool of MIP solutions (False)? The engine randomizes a solved board by
+# permuting symbols, rows, columns, bands and stacks; with SEEDS > 0 it first
+# places that many random clues and completes the board with a MIP over the
+# cells propagation leaves open (see sudoku.py)
+ENGINE = True
+SEEDS = 0
+SEED = None
+
+# The solver that completes seeded boards: "mip" or "exact-cover" (Algorithm X,
+# which needs no Gurobi license; see sudoku_benchmark.py for how they compare).
+# Algorithm X completes 9 x 9 and 16 x 16 boards in milliseconds, but a single
+# 25 x 25 completion can take a minute, so each try is cut off after
+# TRY_SECONDS and the seeds are drawn again
+BACKEND = "mip"
+TRY_SECONDS = 5
 
 # Define the size of the Sudoku puzzle where box_size equals N
 box_size = 3
@@ -15,46 +32,73 @@ box_size = 3
 grid_size = box_size * box_size 
 rows = columns = values = range(1, grid_size + 1)
 
-# Decision variables: Binary variable indicating whether a value is xed to a cell
-x = model.addVars(rows, columns, values, vtype=gb.GRB.BINARY, name="Cell Value")
+if ENGINE:
+    start = time.perf_counter()
+    solution = sudoku.generate(box_size, np.random.default_rng(SEED), seeds=SEEDS, backend=BACKEND,
+                               time_limit=TRY_SECONDS)
+    print("Board Generation Time (s): ", time.perf_counter() - start)
 
-# Add Constraints
+else:
+
+    # Create a new model
+    model = gb.Model("Sudoku Engine")
+
+    # Decision variables: Binary variable indicating whether a value is xed to a cell
+    x = model.addVars(rows, columns, values, vtype=gb.GRB.BINARY, name="Cell Value")
+
+    # Add Constraints
+
+    # Constraint: Each cell can only have one value
+    model.addConstrs(gb.quicksum(x[i, j, k] for k in values) == 1 for i in rows for j in columns)
+
+    # Constraint: Each value can only appear once in each row
+    model.addConstrs(gb.quicksum(x[i, j, k] for j in values) == 1 for i in rows for k in values)
+
+    # Constraint: Each value can only appear once in each column
+    model.addConstrs(gb.quicksum(x[i, j, k] for i in values) == 1 for j in columns for k in values)
 
-# Constraint: Each cell can only have one value
-model.addConstrs(gb.quicksum(x[i, j, k] for k in values) == 1 for i in rows for j in columns)
+    # Constraint: Each value can only appear once in each box
+    model.addConstrs(gb.quicksum(x[1 + box_size * l + i, 1 + box_size * m + j, k] for i in range(box_size) for j in range(box_size)) == 1
+         for l in range(box_size) for m in range(box_size) for k in values)
 
-# Constraint: Each value can only appear once in each row
-model.addConstrs(gb.quicksum(x[i, j, k] for j in values) == 1 for i in rows for k in values)
 
-# Constraint: Each value can only appear once in each column
-model.addConstrs(gb.quicksum(x[i, j, k] for i in values) == 1 for j in columns for k in values)
+    # Set the condition such that Gurobi continuous searching for feasible solutions
+    model.setParam('PoolSearchMode', 2)
 
-# Constraint: Each value can only appear once in each box
-model.addConstrs(gb.quicksum(x[1 + box_size * l + i, 1 + box_size * m + j, k] for i in range(box_size) for j in range(box_size)) == 1
-     for l in range(box_size) for m in range(box_size) for k in values)
+    # Set the number of feasible solutions that Gurobi should look for
+    model.setParam('PoolSolutions', ONE_FEASIBLE if ONE_FEASIBLE >= 2 else 1)
 
+    # Which of the feasible solutions should Gurobi return?
+    model.setParam('SolutionNumber', random.randrange(ONE_FEASIBLE if ONE_FEASIBLE >= 2 else 1))
 
-# Set the condition such that Gurobi continuous searching for feasible solutions
-model.setParam('PoolSearchMode', 2)
+    # Optimize the model
+    model.optimize()
 
-# Set the number of feasible solutions that Gurobi should look for
-model.setParam('PoolSolutions', ONE_FEASIBLE if ONE_FEASIBLE >= 2 else 1)
+    # Define the gameboard
+    cells = [(i, j, k) for i in values for j in values for k in values]
 
-# Which of the feasible solutions should Gurobi return?
-model.setParam('SolutionNumber', random.randrange(ONE_FEASIBLE if ONE_FEASIBLE >= 2 else 1))
+    # Read the Sudoku puzzle off the chosen solution
+    solution = None
+    if model.status == gb.GRB.OPTIMAL:
+        solution = [[0] * grid_size for _ in range(grid_size)]
+        for i, j, k in cells:
+            if x[i, j, k].xn > 0.5:
+                solution[i - 1][j - 1] = k
 
-# Optimize the model
-model.optimize()
+    # Number of decision variables in the model
+    print("Number of Decision Variables: ", model.numVars)
 
-# Define the gameboard
-cells = [(i, j, k) for i in values for j in values for k in values]
+    # Number of constraints in the model
+    print("Number of Constraints: ", model.numConstrs)
+
+    # The time it takes to solve the model
+    print("Model Runtime (s): ", model.Runtime)
+
+    # How many feasible solutions were originally generated
+    print("Solution Count:", model.getAttr('SolCount'))
 
 # Print the Sudoku puzzle
-if model.status == gb.GRB.OPTIMAL:
-    solution = [[0] * grid_size for _ in range(grid_size)]
-    for i, j, k in cells:
-        if x[i, j, k].xn > 0.5:
-            solution[i - 1][j - 1] = k
+if solution is not None:
     
     # Plot the Sudoku solution
     fig, ax = plt.subplots()
@@ -80,15 +124,3 @@ if model.status == gb.GRB.OPTIMAL:
     
 else:
     print("No solution found.")
-
-# Number of decision variables in the model
-print("Number of Decision Variables: ", model.numVars)
-
-# Number of constraints in the model
-print("Number of Constraints: ", model.numConstrs)
-
-# The time it takes to solve the model
-print("Model Runtime (s): ", model.Runtime)
-
-# How many feasible solutions were originally generated
-print("Solution Count:", model.getAttr('SolCount'))
\ No newline at end of file
@@ -1,4 +1,6 @@
+import numpy as np
 from gurobipy import Model, GRB
+from benders import facility_location, solve
 
 # Create a new model
 m = Model("road_salt_storage")
@@ -14,53 +16,79 @@ fixed_cost = 500000
 def calc_cni(n, i):
     return (n**2 * (11 - (i / 4))) / 10
 
-# Decision variables
-x = m.addVars(n_locations, vtype=GRB.BINARY, name="x")
-y = m.addVars(n_locations, n_wards, vtype=GRB.CONTINUOUS, name="y", lb=0)
+# Solve with Benders decomposition over the site openings (True) or as one MIP (False)?
+DECOMPOSE = False
 
-# Objective function
-m.setObjective(sum(fixed_cost * x[n] for n in range(n_locations)) +
-               sum(calc_cni(n+1, i+1) * y[n,i] for n in range(n_locations) for i in range(n_wards)),
-               GRB.MINIMIZE)
+if DECOMPOSE:
 
-# Constraints
+    # Transportation costs, capacities and ward demands as arrays
+    cost = np.array([[calc_cni(n+1, i+1) for i in range(n_wards)] for n in range(n_locations)])
+    block = facility_location(np.full(n_locations, max_capacity), cost, np.full(n_wards, min_salt_per_ward))
 
-# Constraint a: Capacity limit at each site
-m.addConstrs((sum(y[n, i] for i in range(n_wards)) <= max_capacity * x[n] for n in range(n_locations)), "capacity")
+    # Constraints c-h only involve the site openings, so they stay in the master problem
+    def site_rules(model, x):
+        model.addConstr(x.sum() >= 8, "min_sites")
+        model.addConstr(x[[1, 3, 5, 7, 9, 11]].sum() <= 3, "specific_limit")
+        model.addConstr(x[6] <= x[12], "link_7_13")
+        model.addConstr(x[0] + x[4] + x[13] == 2, "exact_two")
+        model.addConstr(x[1] + x[11] <= 1, "exclusive_2_12")
+        model.addConstr(x[2] <= x[1], "cond_3_2")
+        model.addConstr(x[2] <= x[8], "cond_3_9")
+        model.addConstr(x[2] <= x[10], "cond_3_11")
 
-# Constraint b: Demand at each ward
-m.addConstrs((sum(y[n, i] for n in range(n_locations)) >= min_salt_per_ward for i in range(n_wards)), "demand")
+    objective, opened, flows = solve(np.full(n_locations, fixed_cost), [block], [site_rules])
+    print('Optimal cost: ', objective)
+    print('Open sites: ', [n + 1 for n in range(n_locations) if opened[n] > 0.5])
 
-# Constraint c: At least 8 storage sites must be opened
-m.addConstr(sum(x[n] for n in range(n_locations)) >= 8, "min_sites")
+else:
 
-# Constraint d: Limitation on specific sites
-specific_sites = [1, 3, 5, 7, 9, 11]
-m.addConstr(sum(x[n] for n in specific_sites) <= 3, "specific_limit")
+    # Decision variables
+    x = m.addVars(n_locations, vtype=GRB.BINARY, name="x")
+    y = m.addVars(n_locations, n_wards, vtype=GRB.CONTINUOUS, name="y", lb=0)
 
-# Constraint e: Linked opening of sites 7 and 13
-m.addConstr(x[6] <= x[12], "link_7_13")
+    # Objective function
+    m.setObjective(sum(fixed_cost * x[n] for n in range(n_locations)) +
+                   sum(calc_cni(n+1, i+1) * y[n,i] for n in range(n_locations) for i in range(n_wards)),
+                   GRB.MINIMIZE)
 
-# Constraint f: Exact two sites among 1, 5, 14
-m.addConstr(x[0] + x[4] + x[13] == 2, "exact_two")
+    # Constraints
 
-# Constraint g: Exclusive sites 2 and 12
-m.addConstr(x[1] + x[11] <= 1, "exclusive_2_12")
+    # Constraint a: Capacity limit at each site
+    m.addConstrs((sum(y[n, i] for i in range(n_wards)) <= max_capacity * x[n] for n in range(n_locations)), "capacity")
 
-# Constraint h: Conditional openings
-m.addConstr(x[2] <= x[1], "cond_3_2")
-m.addConstr(x[2] <= x[8], "cond_3_9")
-m.addConstr(x[2] <= x[10], "cond_3_11")
+    # Constraint b: Demand at each ward
+    m.addConstrs((sum(y[n, i] for n in range(n_locations)) >= min_salt_per_ward for i in range(n_wards)), "demand")
 
-# Optimize model
-m.optimize()
+    # Constraint c: At least 8 storage sites must be opened
+    m.addConstr(sum(x[n] for n in range(n_locations)) >= 8, "min_sites")
 
-# Print solution
-if m.status == GRB.OPTIMAL:
-    print('Optimal solution found:\n')
-    for v in m.getVars():
-        if v.x > 0:
-            print(f"{v.varName} = {v.x}")
+    # Constraint d: Limitation on specific sites
+    specific_sites = [1, 3, 5, 7, 9, 11]
+    m.addConstr(sum(x[n] for n in specific_sites) <= 3, "specific_limit")
 
-else:
-    print('No optimal solution found.')
+    # Constraint e: Linked opening of sites 7 and 13
+    m.addConstr(x[6] <= x[12], "link_7_13")
+
+    # Constraint f: Exact two sites among 1, 5, 14
+    m.addConstr(x[0] + x[4] + x[13] == 2, "exact_two")
+
+    # Constraint g: Exclusive sites 2 and 12
+    m.addConstr(x[1] + x[11] <= 1, "exclusive_2_12")
+
+    # Constraint h: Conditional openings
+    m.addConstr(x[2] <= x[1], "cond_3_2")
+    m.addConstr(x[2] <= x[8], "cond_3_9")
+    m.addConstr(x[2] <= x[10], "cond_3_11")
+
+    # Optimize model
+    m.optimize()
+
+    # Print solution
+    if m.status == GRB.OPTIMAL:
+        print('Optimal solution found:\n')
+        for v in m.getVars():
+            if v.x > 0:
+                print(f"{v.varName} = {v.x}")
+
+    else:
+        print('No optimal solution found.')
@@ -2,7 +2,10 @@
 from gurobipy import GRB
 import gurobipy as gb
 import pandas as pd
-import random
+from functools import partial
+import numpy as np
+import newsvendor
+import saa
 
 # Read data
 df = pd.read_csv("/Users/mahinbindra/Downloads/vaccine_sales.csv")
@@ -14,92 +17,92 @@ df.describe()
 r = 5.14
 v = 1.47
 
-# The model to run: profit using SAA (0), exact (!=0)
+# The model to run: profit using SAA (0), exact (1), closed-form newsvendor (2)
 model_type = 1
 
+# Verify the closed-form newsvendor solution against the exact model?
+CROSS_CHECK = True
+
 # Initialize model 
 model = gb.Model("Vaccine Procruement")
  
 # The SAA algorithm
 if model_type == 0:
 
-    # The sum of all objectives and decision variables
-    objectives = 0
-    capacities = 0
-    
-    # The number of trials to perform
+    # The number of trials to perform (at most)
     trials = 250
     
     # The number of scenarios per trial
     samples = 50
+
+    # Reproducible trials over a pool of worker processes; every worker keeps
+    # one SAA model (see saa.py). Stop once the gap is below the tolerance.
+    SEED = 2024
+    WORKERS = 1
+    TOLERANCE = None
+
+    problem = partial(saa.vaccine_problem, df.doses.to_numpy(), df.cost.to_numpy(), samples, r, v)
+    results = saa.run_trials(problem, trials, sense=GRB.MAXIMIZE, seed=SEED, workers=WORKERS, tol=TOLERANCE)
+
+    print("Trials: ", results["trials"])
+    print("Objective: ", results["objectives"].mean())
+    print("Optimal Capacity: ", results["decisions"].mean())
+    print("Candidate Capacity: ", results["candidate"])
+    print("Lower Bound (candidate profit): %.4f, 95%% CI (%.4f, %.4f)" % (results["lower"], *results["lower_ci"]))
+    print("Upper Bound (SAA mean): %.4f, 95%% CI (%.4f, %.4f)" % (results["upper"], *results["upper_ci"]))
+    print("Optimality Gap: %.4f, 95%% upper confidence bound %.4f" % (results["gap"], results["gap_ci"]))
+
+# The full model and the closed-form newsvendor solution
+else:
+
+    # Every row of the sales history is an equally likely scenario. With a
+    # shortfall s = doses - x the profit is lost at twice the margin (the sale
+    # and the underage cost); with leftover stock only the salvage cost v is lost.
+    if model_type == 2:
+        margin = r - df.cost.to_numpy()
+        demand = df.doses.to_numpy()
+        intercept = np.column_stack([-margin * demand, -margin * demand])
+        slope = np.column_stack([np.full(len(margin), -v), 2 * margin])
+        probabilities = np.full(len(demand), 1.0 / len(demand))
+        capacity_fast, cost_fast = newsvendor.solve(demand, probabilities, 0.0, [-np.inf, 0.0, np.inf], intercept, slope)
+
+        print("Objective: ", -cost_fast)
+        print("Optimal Capacity: ", capacity_fast)
+
+    if model_type == 1 or CROSS_CHECK:
     
-    for trial in range(trials):
+        # The number of scenarios
+        scenarios = df.shape[0]
     
-        # The scenarios in this trial
-        scenarios = random.sample(range(df.shape[0]),samples)
-
         # Add the capacity decision variable (common to all problems)
         x = model.addVar(lb=0, vtype=GRB.INTEGER, name="Capacity")
-    
+
         # Deviational variables in the average model 
-        d_plus = model.addVars(samples, lb=0, vtype=GRB.INTEGER, name="Above")
-        d_minus = model.addVars(samples, lb=0, vtype=GRB.INTEGER, name="Below")    
-        
+        d_plus = model.addVars(scenarios, lb=0, vtype=GRB.INTEGER, name="Above")
+        d_minus = model.addVars(scenarios, lb=0, vtype=GRB.INTEGER, name="Below")    
+    
         # Deterministic objective function 
-        underage_cost = 1.0/samples * gb.quicksum((r - df.cost[scenarios[n]])*d_minus[n] for n in range(samples))
-        overage_cost = 1.0/samples * gb.quicksum((r - df.cost[scenarios[n]] + v)*d_plus[n] for n in range(samples))
-        revenue = 1.0/samples * gb.quicksum((r - df.cost[scenarios[n]])*x for n in range(samples))
+        underage_cost = 1.0/scenarios * gb.quicksum((r - df.cost[n])*d_minus[n] for n in range(scenarios))
+        overage_cost = 1.0/scenarios * gb.quicksum((r - df.cost[n] + v)*d_plus[n] for n in range(scenarios))
+        revenue = 1.0/scenarios * gb.quicksum((r - df.cost[n])*x for n in range(scenarios))
         model.setObjective(revenue - underage_cost - overage_cost, GRB.MAXIMIZE)
-        
+    
         # Demand constraint
-        for n in range(samples):
-            model.addConstr(x + d_minus[n] == df.doses[scenarios[n]] + d_plus[n])
+        for n in range(scenarios):
+            model.addConstr(x + d_minus[n] == df.doses[n] + d_plus[n])
 
         # Optimally solve the problem
         model.optimize()
-        
-        # The running total
-        objectives += model.objVal
-        capacities += x.x
-        
-        # Reset the model
-        model.reset(0)
-        
-    print("Objective: ", objectives/trials)
-    print("Optimal Capacity: ", capacities/trials)
-
-# The full model    
-else:
-    
-    # The number of scenarios
-    scenarios = df.shape[0]
-    
-    # Add the capacity decision variable (common to all problems)
-    x = model.addVar(lb=0, vtype=GRB.INTEGER, name="Capacity")
 
-    # Deviational variables in the average model 
-    d_plus = model.addVars(scenarios, lb=0, vtype=GRB.INTEGER, name="Above")
-    d_minus = model.addVars(scenarios, lb=0, vtype=GRB.INTEGER, name="Below")    
-    
-    # Deterministic objective function 
-    underage_cost = 1.0/scenarios * gb.quicksum((r - df.cost[n])*d_minus[n] for n in range(scenarios))
-    overage_cost = 1.0/scenarios * gb.quicksum((r - df.cost[n] + v)*d_plus[n] for n in range(scenarios))
-    revenue = 1.0/scenarios * gb.quicksum((r - df.cost[n])*x for n in range(scenarios))
-    model.setObjective(revenue - underage_cost - overage_cost, GRB.MAXIMIZE)
-    
-    # Demand constraint
-    for n in range(scenarios):
-        model.addConstr(x + d_minus[n] == df.doses[n] + d_plus[n])
-
-    # Optimally solve the problem
-    model.optimize()
+        # Number of decision variables in the model
+        print("Number of Decision Variables: ", model.numVars)
 
-    # Number of decision variables in the model
-    print("Number of Decision Variables: ", model.numVars)
-
-    # Number of constraints in the model
-    print("Number of Constraints: ", model.numConstrs)
+        # Number of constraints in the model
+        print("Number of Constraints: ", model.numConstrs)
     
-    # The objective and capacity level
-    print("Objective: ", model.objVal)
-    print("Optimal Capacity: ", x.x)
\ No newline at end of file
+        # The objective and capacity level
+        print("Objective: ", model.objVal)
+        print("Optimal Capacity: ", x.x)
+
+    if model_type == 2 and CROSS_CHECK:
+        newsvendor.cross_check(capacity_fast, -cost_fast, x.x, model.objVal)
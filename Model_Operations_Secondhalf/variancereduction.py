@@ -0,0 +1,73 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+import streaming
+
+# A Monte Carlo estimate of a mean: the estimate, its standard error and the
+# number of draws (simulated trials) it took
+Estimate = namedtuple("Estimate", ["mean", "standard_error", "draws"])
+
+
+# Crude Monte Carlo, from a streaming summary (see streaming.py)
+def crude(stats):
+    return Estimate(stats.mean, streaming.standard_error(stats), stats.count)
+
+
+# Split size draws over strata in proportion to their probabilities (largest
+# remainders get the leftover draws), or in proportion to probability times
+# standard deviation when the deviations are given (Neyman allocation)
+def allocate(weights, size, deviations=None):
+    weights = np.asarray(weights, dtype=float)
+    share = weights if deviations is None else weights * np.asarray(deviations, dtype=float)
+    share = share / share.sum() * size
+    counts = np.floor(share).astype(int)
+    counts[np.argsort(counts - share)[:size - counts.sum()]] += 1
+    return counts
+
+
+# Stratified sampling: each stratum (a branch of known probability) is
+# summarized separately and the estimate is the probability-weighted mean.
+# Only the variance within the strata remains. Like streaming.standard_error,
+# the standard error is infinite while a stratum of positive probability has
+# fewer than two draws.
+def stratified(stats, weights):
+    weights = np.asarray(weights, dtype=float)
+    mean = sum(w * s.mean for w, s in zip(weights, stats))
+    draws = sum(s.count for s in stats)
+    if any(w > 0 and s.count < 2 for w, s in zip(weights, stats)):
+        return Estimate(mean, math.inf, draws)
+    variance = sum(w * w * streaming.variance(s) / s.count for w, s in zip(weights, stats) if w > 0)
+    return Estimate(mean, math.sqrt(variance), draws)
+
+
+# Antithetic variates: values[i] and mirrored[i] come from the same draws
+# mirrored (u and 1 - u, or z and -z), and the pair means are independent
+def antithetic(values, mirrored):
+    pairs = (np.asarray(values, dtype=float) + np.asarray(mirrored, dtype=float)) / 2
+    return Estimate(pairs.mean(), pairs.std(ddof=1) / math.sqrt(len(pairs)), 2 * len(pairs))
+
+
+# Control variates: controls (one column per control) are simulated along
+# with the values and have known means. The coefficients that minimize the
+# variance are estimated by least squares from the same sample.
+def control_variates(values, controls, means):
+    values = np.asarray(values, dtype=float)
+    controls = np.asarray(controls, dtype=float).reshape(len(values), -1)
+    centered = controls - np.asarray(means, dtype=float)
+
+    deviations = centered - centered.mean(axis=0)
+    beta = np.linalg.lstsq(deviations, values - values.mean(), rcond=None)[0]
+    adjusted = values - centered @ beta
+
+    dof = len(values) - controls.shape[1] - 1
+    residuals = adjusted - adjusted.mean()
+    return Estimate(adjusted.mean(), math.sqrt(residuals @ residuals / dof / len(values)), len(values))
+
+
+# The variance-reduction factor: how many times more draws crude Monte Carlo
+# needs for the same standard error
+def reduction_factor(crude_estimate, reduced_estimate):
+    return (crude_estimate.standard_error ** 2 * crude_estimate.draws
+            / (reduced_estimate.standard_error ** 2 * reduced_estimate.draws))
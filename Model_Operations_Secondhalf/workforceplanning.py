@@ -1,6 +1,7 @@
 import gurobipy as gb
 from gurobipy import GRB
 import pandas as pd
+from benders import homecare_block, solve
 
 # # Read the details associated with each center
 df_center = pd.read_csv("homecare_centers.csv", index_col=0)
@@ -40,69 +41,95 @@ travel_cost = {(i,j) : 0.50*df_dist[(df_dist["Center"] == i) & (df_dist["Region"
 # The profit per appointment to the company is the revenue - wage cost - travel cost
 profit_per_appointment = {(i,j,t) : revenue[t] - service_cost[t] - travel_cost[i,j] for i in centers for j in regions for t in periods}
             
-# Create the Gurobi model
-model = gb.Model("Facility Location Model")
+# Solve with Benders decomposition over the open/close decisions (True) or as one MIP (False)?
+DECOMPOSE = False
 
-# Add Decision Variables
+if DECOMPOSE:
 
-# Decision variables: if a center is opened/allocated
-y = model.addVars(centers, vtype=GRB.BINARY, name="y")
+    # Fixed costs of each center over the planning horizon
+    fixed = [(opening_cost[i] if i in ["Center E", "Center F"] else 0.0) + operating_cost[i] * len(periods) for i in centers]
 
-# Decision variables: amount of demand from each region allocated to center, per period
-x = model.addVars(centers, regions, periods, lb=0.0, vtype=GRB.INTEGER, name="x")
+    # The appointments, workers and hires form the recourse (solved as an LP)
+    block = homecare_block(centers, regions, periods, workers, center_capacities, demands, hiring_cost,
+                           max_appointments_per_year, profit_per_appointment)
 
-# Decision variables: number of home care workers per center, per period
-hcw = model.addVars(centers, periods, lb=0, vtype=GRB.INTEGER, name="w")
+    # Centers A-D are opened while it remains to be seen whether centers E and F should be opened
+    def open_centers(model, y):
+        model.addConstr(y[[centers.index(c) for c in ["Center A", "Center B", "Center C", "Center D"]]] == 1)
 
-# Decision variables: number of home care workers to hire per center, per period
-hire = model.addVars(centers, periods, lb=0, vtype=GRB.INTEGER, name="h")
+    objective, opened, flows = solve(fixed, [block], [open_centers])
 
-# Add Constraints
+    # The block minimizes cost, so the profit is the negated objective
+    print("Objective (profit): ", -objective)
+    for k, i in enumerate(centers):
+        if opened[k] > 0.5:
+            print(i + " is open")
 
-# Constraint: All demand must be fully satisfied in every period
-model.addConstrs(gb.quicksum(x[i, j, t] for i in centers) == demands[j, t] for j in regions for t in periods)
+else:
 
-# Constraint: Centers A-D are opened while it remains to be seen whether centers E and F should be opened
-model.addConstrs(y[c] == 1 for c in ["Center A", "Center B", "Center C", "Center D"])
+    # Create the Gurobi model
+    model = gb.Model("Facility Location Model")
 
-# Constraint: Center capacities must be observed in all scenarios
-model.addConstrs(gb.quicksum(x[i, j, t] for j in regions) <= center_capacities[i] * y[i] for i in centers for t in periods)
+    # Add Decision Variables
 
-# Constraint: Flow of workers per period
-model.addConstrs(hcw[i, t] == (workers[i] if t == 2024 else hcw[i, t - 1]) + hire[i, t] for i in centers for t in periods)
+    # Decision variables: if a center is opened/allocated
+    y = model.addVars(centers, vtype=GRB.BINARY, name="y")
 
-# Constraint: Maximum number of hires per year
-model.addConstrs(hire[c, t] <= 300 for c in centers for t in periods)
+    # Decision variables: amount of demand from each region allocated to center, per period
+    x = model.addVars(centers, regions, periods, lb=0.0, vtype=GRB.INTEGER, name="x")
 
-# Constraint: The number of appointments per year are limited by the number of workers at a center
-model.addConstrs(gb.quicksum(x[i, j, t] for j in regions) <= hcw[i, t] * max_appointments_per_year for i in centers for t in periods)
+    # Decision variables: number of home care workers per center, per period
+    hcw = model.addVars(centers, periods, lb=0, vtype=GRB.INTEGER, name="w")
 
-# Objective function
-obj = gb.quicksum(profit_per_appointment[i, j, t] * x[i, j, t] for i in centers for j in regions for t in periods)
-obj -= gb.quicksum(opening_cost[i] * y[i] for i in ["Center E", "Center F"])
-obj -= gb.quicksum(operating_cost[i] * y[i] * len(periods) for i in centers)
-obj -= gb.quicksum(hiring_cost * hire[i, t] for i in centers for t in periods)
+    # Decision variables: number of home care workers to hire per center, per period
+    hire = model.addVars(centers, periods, lb=0, vtype=GRB.INTEGER, name="h")
 
-# Set the objective sense to maximize
-model.setObjective(obj, GRB.MAXIMIZE)
+    # Add Constraints
 
-# Optimize the model
-model.optimize()
+    # Constraint: All demand must be fully satisfied in every period
+    model.addConstrs(gb.quicksum(x[i, j, t] for i in centers) == demands[j, t] for j in regions for t in periods)
 
-# Print solution 
-for i in centers:
-    if y[i].X > 0.5:
-        print(i + " is open:")
-        print("\tNumber of hires: ")
-        for t in periods:
-            if hire[(i,t)].X > 0.0:
-                print("\t\tt=" + str(t) + ": " + str(hire[(i,t)].X))
-        print("\tNumber of workers: ")
-        for t in periods:
-            print("\t\tt=" + str(t) + ": " + str(hcw[(i,t)].X))
+    # Constraint: Centers A-D are opened while it remains to be seen whether centers E and F should be opened
+    model.addConstrs(y[c] == 1 for c in ["Center A", "Center B", "Center C", "Center D"])
 
-# Number of decision variables in the model
-print("Number of Decision Variables: ", model.numVars)
+    # Constraint: Center capacities must be observed in all scenarios
+    model.addConstrs(gb.quicksum(x[i, j, t] for j in regions) <= center_capacities[i] * y[i] for i in centers for t in periods)
 
-# Number of constraints in the model
-print("Number of Constraints: ", model.numConstrs)
\ No newline at end of file
+    # Constraint: Flow of workers per period
+    model.addConstrs(hcw[i, t] == (workers[i] if t == 2024 else hcw[i, t - 1]) + hire[i, t] for i in centers for t in periods)
+
+    # Constraint: Maximum number of hires per year
+    model.addConstrs(hire[c, t] <= 300 for c in centers for t in periods)
+
+    # Constraint: The number of appointments per year are limited by the number of workers at a center
+    model.addConstrs(gb.quicksum(x[i, j, t] for j in regions) <= hcw[i, t] * max_appointments_per_year for i in centers for t in periods)
+
+    # Objective function
+    obj = gb.quicksum(profit_per_appointment[i, j, t] * x[i, j, t] for i in centers for j in regions for t in periods)
+    obj -= gb.quicksum(opening_cost[i] * y[i] for i in ["Center E", "Center F"])
+    obj -= gb.quicksum(operating_cost[i] * y[i] * len(periods) for i in centers)
+    obj -= gb.quicksum(hiring_cost * hire[i, t] for i in centers for t in periods)
+
+    # Set the objective sense to maximize
+    model.setObjective(obj, GRB.MAXIMIZE)
+
+    # Optimize the model
+    model.optimize()
+
+    # Print solution 
+    for i in centers:
+        if y[i].X > 0.5:
+            print(i + " is open:")
+            print("\tNumber of hires: ")
+            for t in periods:
+                if hire[(i,t)].X > 0.0:
+                    print("\t\tt=" + str(t) + ": " + str(hire[(i,t)].X))
+            print("\tNumber of workers: ")
+            for t in periods:
+                print("\t\tt=" + str(t) + ": " + str(hcw[(i,t)].X))
+
+    # Number of decision variables in the model
+    print("Number of Decision Variables: ", model.numVars)
+
+    # Number of constraints in the model
+    print("Number of Constraints: ", model.numConstrs)
\ No newline at end of file
@@ -1,61 +1,59 @@
 import gurobipy as gp
 from gurobipy import GRB
 import pandas as pd
+from grouprules import Term, Rule, add_rules
 
 # Load the dataset
 file_path = '/Users/mahinbindra/Downloads/sp500_data.csv'
 sp500_data = pd.read_csv(file_path)
 
-# Preprocessing to identify sectors and locations
-sectors = sp500_data['GICS Sector'].unique()
-companies = sp500_data['Ticker symbol'].tolist()
-returns = sp500_data.set_index('Ticker symbol')['PercentReturn'].to_dict()
-sector_companies = {sector: sp500_data['Ticker symbol'][sp500_data['GICS Sector'] == sector].tolist() for sector in sectors}
-ny_companies = sp500_data['Ticker symbol'][sp500_data['Location of Headquarters'].str.contains('New York')].tolist()
+# The sector and headquarters rules, written against the dataset's columns
+telecom_sector = "Telecommunications Services"
+it_sector = "Information Technology"
+consumer_discretionary = "Consumer Discretionary"
+consumer_staples = "Consumer Staples"
+energy_sector = "Energy"
+rules = [
+    # No more than $500,000 can be invested in the Telecommunications sector
+    Rule("max_invest_telecom", [Term("GICS Sector", telecom_sector)], "<", 500000),
+
+    # At least 75% in IT compared to Telecommunications
+    Rule("min_invest_it", [Term("GICS Sector", it_sector), Term("GICS Sector", telecom_sector, -0.75)], ">", 0),
+
+    # Difference between Consumer Discretionary and Consumer Staples
+    Rule("consumer_difference_pos", [Term("GICS Sector", consumer_discretionary), Term("GICS Sector", consumer_staples, -1)], "<", 200000),
+    Rule("consumer_difference_neg", [Term("GICS Sector", consumer_staples), Term("GICS Sector", consumer_discretionary, -1)], "<", 200000),
+
+    # At least $1 million must be invested in the Energy sector
+    Rule("min_invest_energy", [Term("GICS Sector", energy_sector)], ">", 1e6),
+
+    # At least $300,000 must be invested in companies headquartered in New York, New York
+    Rule("min_invest_ny", [Term("Location of Headquarters", "New York", contains=True)], ">", 300000),
+]
 
 # Initialize the model
 m = gp.Model("investment_portfolio")
 
-# Decision Variables
-invest = m.addVars(companies, name="invest")
+# Decision Variables: one per company (row of the dataset); at most $600,000
+# can be invested in any individual stock
+invest = m.addMVar(len(sp500_data), ub=600000, name="invest")
 
 # Objective Function
-m.setObjective(gp.quicksum(invest[c] * returns[c] for c in companies), GRB.MAXIMIZE)
+m.setObjective(sp500_data['PercentReturn'].to_numpy() @ invest, GRB.MAXIMIZE)
 
 # Constraints
 # Total investment of $10 million
-m.addConstr(gp.quicksum(invest[c] for c in companies) == 10e6, "total_investment")
-
-# At most $600,000 can be invested in any individual stock
-m.addConstrs((invest[c] <= 600000 for c in companies), "max_invest_individual")
-
-# No more than $500,000 can be invested in the Telecommunications sector
-telecom_sector = "Telecommunications Services"
-m.addConstr(gp.quicksum(invest[c] for c in sector_companies[telecom_sector]) <= 500000, "max_invest_telecom")
-
-# At least 75% in IT compared to Telecommunications
-it_sector = "Information Technology"
-m.addConstr(gp.quicksum(invest[c] for c in sector_companies[it_sector]) >= 0.75 * gp.quicksum(invest[c] for c in sector_companies[telecom_sector]), "min_invest_it")
-
-# Difference between Consumer Discretionary and Consumer Staples
-consumer_discretionary = "Consumer Discretionary"
-consumer_staples = "Consumer Staples"
-m.addConstr(gp.quicksum(invest[c] for c in sector_companies[consumer_discretionary]) - gp.quicksum(invest[c] for c in sector_companies[consumer_staples]) <= 200000, "consumer_difference_pos")
-m.addConstr(gp.quicksum(invest[c] for c in sector_companies[consumer_staples]) - gp.quicksum(invest[c] for c in sector_companies[consumer_discretionary]) <= 200000, "consumer_difference_neg")
-
-# At least $1 million must be invested in the Energy sector
-energy_sector = "Energy"
-m.addConstr(gp.quicksum(invest[c] for c in sector_companies[energy_sector]) >= 1e6, "min_invest_energy")
+m.addConstr(invest.sum() == 10e6, "total_investment")
 
-# At least $300,000 must be invested in companies headquartered in New York, New York
-m.addConstr(gp.quicksum(invest[c] for c in ny_companies) >= 300000, "min_invest_ny")
+# The group rules, compiled into one sparse matrix
+add_rules(m, invest, sp500_data, rules)
 
 # Solve the model
 m.optimize()
 
-# Display the solution
+# Display the solution, joined back to the companies by row
 if m.status == GRB.OPTIMAL:
-    solution = m.getAttr('x', invest)
-    for c in companies:
-        if solution[c] > 0:
-            print(f"Invest ${solution[c]:,.2f} in {c} ({sp500_data.loc[sp500_data['Ticker symbol'] == c, 'Company'].iloc[0]})")
+    portfolio = sp500_data.assign(invest=invest.X)
+    chosen = portfolio.loc[portfolio['invest'] > 0, ['Ticker symbol', 'Company', 'invest']]
+    for c, company, amount in chosen.itertuples(index=False):
+        print(f"Invest ${amount:,.2f} in {c} ({company})")
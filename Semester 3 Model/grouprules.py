@@ -0,0 +1,59 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Declarative linear rules over groups of DataFrame rows. A Term selects the
+# rows whose column equals a value (or, with contains=True, contains it as
+# text) and weighs the sum of their variables by coef; a Rule is a sum of
+# terms compared with a right-hand side:
+#
+#     Rule("min_invest_it", [Term("GICS Sector", "Information Technology"),
+#                            Term("GICS Sector", "Telecommunications Services", -0.75)], ">", 0)
+#
+# means  sum(IT) - 0.75 sum(Telecom) >= 0.
+Term = namedtuple("Term", ["column", "value", "coef", "contains"], defaults=[1.0, False])
+Rule = namedtuple("Rule", ["name", "terms", "sense", "rhs"])
+
+
+# Compile rules into one sparse (rules x rows) matrix with their senses and
+# right-hand sides. Each column used is factorized once; a term then selects
+# its rows by comparing integer codes (a text match only tests the distinct
+# values), so no per-category lists of rows are built.
+def compile_rules(data, rules):
+    factorized = {}
+    rows, cols, vals = [], [], []
+
+    for r, rule in enumerate(rules):
+        for term in rule.terms:
+            if term.column not in factorized:
+                factorized[term.column] = pd.factorize(data[term.column])
+            codes, uniques = factorized[term.column]
+
+            if term.contains:
+                matches = np.flatnonzero(pd.Series(uniques).astype(str).str.contains(term.value, regex=False))
+            else:
+                matches = np.flatnonzero(uniques == term.value)
+            if len(matches) == 0:
+                raise ValueError("Rule %s: no rows with %s %s %r" % (rule.name, term.column,
+                                 "containing" if term.contains else "==", term.value))
+
+            members = np.flatnonzero(np.isin(codes, matches))
+            rows.append(np.full(len(members), r))
+            cols.append(members)
+            vals.append(np.full(len(members), float(term.coef)))
+
+    # Duplicate entries (a row in two terms of one rule) are summed
+    matrix = sp.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                           shape=(len(rules), len(data)))
+    senses = np.array([rule.sense for rule in rules])
+    rhs = np.array([rule.rhs for rule in rules], dtype=float)
+    return matrix, senses, rhs
+
+
+# Add rules over the rows of data to a model in one call; x holds one variable
+# per row of data, in the same order
+def add_rules(model, x, data, rules):
+    matrix, senses, rhs = compile_rules(data, rules)
+    return model.addMConstr(matrix, x, senses, rhs, name=[rule.name for rule in rules])